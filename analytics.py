@@ -0,0 +1,146 @@
+import os
+import threading
+import time
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from dotenv import load_dotenv
+
+import routing
+
+load_dotenv()
+
+# outflow per product and warehouse over rolling windows, and days of cover at the
+# current stock. stock_movement is pre-aggregated in sql to one row per (product,
+# warehouse, day); only movements past the last processed movement_id are read on
+# each refresh. a full rebuild every analytics_rebuild_seconds also picks up rows a
+# slow transaction committed with a lower movement_id than one already processed.
+analytics_rebuild_seconds = float(os.getenv("analytics_rebuild_seconds", 900))
+
+WINDOWS = (7, 30, 90)
+
+# days of cover are based on the average daily outflow over this window
+COVER_WINDOW = 30
+
+_DAILY_QUERY = """
+    SELECT product_id, warehouse_id, movement_date, SUM(quantity) AS quantity
+    FROM stock_movement
+    WHERE movement_type = 'out'
+      AND movement_date >= :since
+      AND movement_id > :lo AND movement_id <= :hi
+    GROUP BY product_id, warehouse_id, movement_date
+"""
+
+_STOCK_QUERY = """
+    SELECT i.product_id, p.product_name, i.warehouse_id, w.warehouse_city, i.stock_left
+    FROM inventory i
+    JOIN products p ON p.product_id = i.product_id
+    JOIN warehouse w ON w.warehouse_id = i.warehouse_id
+"""
+
+DAILY_COLUMNS = ["product_id", "warehouse_id", "movement_date", "quantity"]
+
+
+class Velocity:
+
+    def __init__(self, rebuild_seconds):
+        self.rebuild_seconds = rebuild_seconds
+        self._lock = threading.Lock()
+        self._daily = pd.DataFrame(columns=DAILY_COLUMNS)
+        self._last_id = 0
+        self._built_at = None
+        self.refreshes = 0
+
+    def refresh(self, engine):
+
+        # reads the outflow committed since the last refresh and folds it into the daily
+        # totals; returns the daily frame covering the longest window up to today
+        today = date.today()
+        since = today - timedelta(days=max(WINDOWS) - 1)
+        engine = routing.reader(engine)
+
+        with self._lock:
+            rebuild = self._built_at is None or time.monotonic() - self._built_at >= self.rebuild_seconds
+            lo = 0 if rebuild else self._last_id
+
+            with engine.begin() as conn:
+                # bounded above so rows committed while aggregating are left for the next refresh
+                hi = conn.execute(text("SELECT COALESCE(MAX(movement_id), 0) FROM stock_movement")).scalar()
+                new = pd.DataFrame(conn.execute(text(_DAILY_QUERY), {"since": since, "lo": lo, "hi": hi}).fetchall(),
+                                   columns=DAILY_COLUMNS)
+
+            new["movement_date"] = pd.to_datetime(new["movement_date"])
+            new["quantity"] = new["quantity"].astype(np.int64)
+            daily = new if rebuild or self._daily.empty else pd.concat([self._daily, new], ignore_index=True)
+
+            # the same day can arrive in several refreshes, and days age out of the window
+            daily = daily[daily["movement_date"] >= pd.Timestamp(since)]
+            self._daily = (daily.groupby(["product_id", "warehouse_id", "movement_date"], as_index=False)["quantity"]
+                           .sum())
+            # reads can alternate between replica and primary, never step back
+            self._last_id = hi if rebuild else max(self._last_id, hi)
+            self.refreshes += 1
+            if rebuild:
+                self._built_at = time.monotonic()
+            return self._daily.copy()
+
+    def report(self, engine):
+
+        # one row per inventory record: outflow over each window, the average daily
+        # outflow and days of cover at the current stock (NaN when nothing goes out)
+        daily = self.refresh(engine)
+        today = pd.Timestamp(date.today())
+
+        with routing.reader(engine).begin() as conn:
+            stock = pd.DataFrame(conn.execute(text(_STOCK_QUERY)).fetchall(),
+                                 columns=["product_id", "product_name", "warehouse_id", "warehouse_city", "stock_left"])
+
+        # dense (product, warehouse) x day matrix, oldest day first, so every window is a
+        # slice sum over the same array
+        days = pd.date_range(today - pd.Timedelta(days=max(WINDOWS) - 1), today)
+        matrix = (daily.pivot_table(index=["product_id", "warehouse_id"], columns="movement_date",
+                                    values="quantity", aggfunc="sum", fill_value=0)
+                  .reindex(columns=days, fill_value=0))
+        values = matrix.to_numpy(dtype=np.int64)
+
+        outflow = pd.DataFrame({f"out_{n}d": values[:, -n:].sum(axis=1) for n in WINDOWS}, index=matrix.index)
+        report = stock.merge(outflow, left_on=["product_id", "warehouse_id"], right_index=True, how="left")
+        for n in WINDOWS:
+            report[f"out_{n}d"] = report[f"out_{n}d"].fillna(0).astype(np.int64)
+
+        report["avg_daily_out"] = report[f"out_{COVER_WINDOW}d"] / COVER_WINDOW
+        report["days_of_cover"] = (report["stock_left"] / report["avg_daily_out"].where(report["avg_daily_out"] > 0)).round(1)
+        report["avg_daily_out"] = report["avg_daily_out"].round(2)
+        return report.sort_values(["days_of_cover", "product_id"], na_position="last").reset_index(drop=True)
+
+    def daily_series(self, engine, product_id, warehouse_id=None):
+
+        # daily outflow of one product (one warehouse or all of them) with trailing
+        # 7 day rolling sum and mean, indexed by day
+        daily = self.refresh(engine)
+        today = pd.Timestamp(date.today())
+        rows = daily[daily["product_id"] == product_id]
+        if warehouse_id is not None:
+            rows = rows[rows["warehouse_id"] == warehouse_id]
+
+        series = (rows.groupby("movement_date")["quantity"].sum()
+                  .reindex(pd.date_range(today - pd.Timedelta(days=max(WINDOWS) - 1), today), fill_value=0))
+        return pd.DataFrame({
+            "out": series,
+            "rolling_7d": series.rolling(7, min_periods=1).sum(),
+            "rolling_7d_avg": series.rolling(7, min_periods=1).mean().round(2)
+        })
+
+    def invalidate(self):
+        with self._lock:
+            self._built_at = None
+
+
+velocity = Velocity(analytics_rebuild_seconds)
+
+def stock_velocity(engine):
+    return velocity.report(engine)
+
+def daily_outflow(engine, product_id, warehouse_id=None):
+    return velocity.daily_series(engine, product_id, warehouse_id)
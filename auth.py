@@ -1,8 +1,155 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from sqlalchemy import text
-from werkzeug.security import check_password_hash
+from werkzeug.security import check_password_hash, generate_password_hash
+from dotenv import load_dotenv
+
 from db import engine
 
-def authenticate(username, password):
+load_dotenv()
+
+log = logging.getLogger("wms.auth")
+
+# password hashing runs on a small worker pool so a login storm uses at most auth_workers
+# cores; logins beyond auth_max_pending are turned away instead of piling up
+auth_workers = int(os.getenv("auth_workers", 4))
+auth_max_pending = int(os.getenv("auth_max_pending", 32))
+auth_timeout = float(os.getenv("auth_timeout", 10))
+
+# failed logins allowed per username and per client address within login_window_seconds
+login_max_failures = int(os.getenv("login_max_failures", 5))
+login_ip_max_failures = int(os.getenv("login_ip_max_failures", 20))
+login_window_seconds = float(os.getenv("login_window_seconds", 300))
+# distinct usernames / addresses tracked per throttle, so random usernames cannot grow it unbounded
+login_throttle_max_keys = int(os.getenv("login_throttle_max_keys", 100000))
+
+# hashing policy, a werkzeug method string such as "scrypt" or "pbkdf2:sha256:600000";
+# stored hashes made with another method are rehashed on the next successful login
+password_hash_method = os.getenv("password_hash_method", "scrypt")
+
+# signed session tokens, kept in the SESSION_COOKIE browser cookie; without a configured
+# secret tokens only last until a restart
+session_secret = os.getenv("session_secret")
+session_ttl_seconds = int(os.getenv("session_ttl_seconds", 8 * 3600))
+SESSION_COOKIE = "wms_session"
+
+if not session_secret:
+    log.warning("session_secret not set, session tokens will not survive a restart")
+    session_secret = secrets.token_hex(32)
+
+_pool = ThreadPoolExecutor(max_workers=auth_workers, thread_name_prefix="auth")
+_slots = threading.BoundedSemaphore(auth_max_pending)
+
+
+def hash_password(password):
+    return generate_password_hash(password, method=password_hash_method)
+
+@lru_cache(maxsize=1)
+def _policy_prefix():
+    # "method$salt$hash": the method part of a hash made with the current policy
+    return hash_password("").split("$", 1)[0]
+
+@lru_cache(maxsize=1)
+def _dummy_hash():
+    # checked against when the username does not exist, so the response time does
+    # not tell which usernames are valid
+    return hash_password(secrets.token_hex(16))
+
+
+class Throttle:
+
+    # sliding window of failure times per key. keys whose window has passed are swept
+    # once per window, and beyond max_keys the keys that failed first are dropped
+    def __init__(self, limit, window, max_keys=login_throttle_max_keys):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._failures = {}
+        self._swept = time.monotonic()
+
+    def _recent(self, key, now):
+        failures = self._failures.get(key)
+        if failures is None:
+            return None
+        while failures and failures[0] <= now - self.window:
+            failures.popleft()
+        if not failures:
+            del self._failures[key]
+            return None
+        return failures
+
+    def retry_after(self, key):
+        # seconds until key may try again, 0 if it is not throttled
+        now = time.monotonic()
+        with self._lock:
+            failures = self._recent(key, now)
+            if failures is None or len(failures) < self.limit:
+                return 0
+            return int(failures[0] + self.window - now) + 1
+
+    def fail(self, key):
+        now = time.monotonic()
+        with self._lock:
+            self._recent(key, now)
+            self._failures.setdefault(key, deque()).append(now)
+            if now - self._swept >= self.window or len(self._failures) > self.max_keys:
+                self._sweep(now)
+
+    def _sweep(self, now):
+        self._swept = now
+        for stale in [k for k, failures in self._failures.items() if failures[-1] <= now - self.window]:
+            del self._failures[stale]
+        # dicts keep insertion order: the first keys are the ones that started failing earliest
+        for oldest in list(self._failures)[:len(self._failures) - self.max_keys]:
+            del self._failures[oldest]
+
+    def clear(self, key):
+        with self._lock:
+            self._failures.pop(key, None)
+
+
+user_throttle = Throttle(login_max_failures, login_window_seconds)
+ip_throttle = Throttle(login_ip_max_failures, login_window_seconds)
+
+
+def _verify(user_id, stored_hash, password):
+
+    # runs on the auth pool: check the password and upgrade an outdated hash; the
+    # UPDATE only applies if the hash was not changed meanwhile (e.g. a reset)
+    if not check_password_hash(stored_hash, password):
+        return False
+
+    if user_id is not None and stored_hash.split("$", 1)[0] != _policy_prefix():
+        query = """UPDATE users
+                    SET password = :new
+                    WHERE user_id = :uid AND password = :old
+        """
+        with engine.begin() as conn:
+            conn.execute(text(query), {"new": hash_password(password), "uid": user_id, "old": stored_hash})
+    return True
+
+def authenticate(username, password, ip=None):
+
+    # the user dict on success, None for bad credentials; raises ValueError while
+    # the username or address is throttled or the hashing pool is saturated
+    for throttle, key in ((user_throttle, username.casefold()), (ip_throttle, ip)):
+        if key is None:
+            continue
+        wait = throttle.retry_after(key)
+        if wait:
+            raise ValueError(f"Too many failed logins, try again in {wait} seconds")
+
     query = """
     SELECT user_id, username, password, role
     FROM users
@@ -15,15 +162,109 @@ def authenticate(username, password):
             {"username": username}
         ).fetchone()
 
-    if not user:
+    # the slot is held until the hashing job itself finishes, not just until this call
+    # stops waiting for it, so auth_max_pending bounds the queued and running work
+    if not _slots.acquire(blocking=False):
+        raise ValueError("Login service busy, please try again")
+    try:
+        if user:
+            future = _pool.submit(_verify, user.user_id, user.password, password)
+        else:
+            future = _pool.submit(_verify, None, _dummy_hash(), password)
+    except BaseException:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda done: _slots.release())
+
+    try:
+        ok = future.result(timeout=auth_timeout) and user is not None
+    except TimeoutError:
+        raise ValueError("Login service busy, please try again")
+
+    if not ok:
+        user_throttle.fail(username.casefold())
+        if ip is not None:
+            ip_throttle.fail(ip)
         return None
 
-    if check_password_hash(user.password, password):
-        return {
-            "user_id": user.user_id,
-            "username": user.username,
-            "role": user.role
-        }
+    user_throttle.clear(username.casefold())
+    return {
+        "user_id": user.user_id,
+        "username": user.username,
+        "role": user.role
+    }
+
+
+# session tokens: base64url(json payload) "." base64url(hmac-sha256), checked without
+# hashing. revocations are rows of session_revocation, so a logout holds in every app
+# process and across restarts; a token is only verified when a browser session starts.
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+def _unb64(value):
+    return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+
+def _sign(payload):
+    return _b64(hmac.new(session_secret.encode(), payload.encode(), hashlib.sha256).digest())
+
+def issue_token(user):
+    now = time.time()
+    payload = _b64(json.dumps({
+        "uid": user["user_id"],
+        "usr": user["username"],
+        "role": user["role"],
+        "iat": now,
+        "exp": int(now) + session_ttl_seconds,
+        "jti": secrets.token_hex(8)
+    }, separators=(",", ":")).encode())
+    return f"{payload}.{_sign(payload)}"
+
+def _claims(token):
+    try:
+        payload, signature = token.split(".")
+        if not hmac.compare_digest(signature, _sign(payload)):
+            return None
+        return json.loads(_unb64(payload))
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+def verify_token(token):
+    # the user dict for a valid, unexpired, unrevoked token, otherwise None
+    claims = _claims(token)
+    if claims is None or claims["exp"] <= time.time():
+        return None
+    query = """SELECT 1
+                FROM session_revocation
+                WHERE revocation_key = :jti
+                   OR (revocation_key = :uid AND revoked_at > :iat)
+                LIMIT 1
+    """
+    with engine.begin() as conn:
+        revoked = conn.execute(text(query), {"jti": f"jti:{claims['jti']}", "uid": f"uid:{claims['uid']}",
+                                             "iat": claims["iat"]}).fetchone()
+    if revoked:
+        return None
+    return {"user_id": claims["uid"], "username": claims["usr"], "role": claims["role"]}
+
+def _revoke(key, expires_at):
+    now = time.time()
+    query = """INSERT INTO session_revocation (revocation_key, revoked_at, expires_at)
+                VALUES (:key, :now, :exp)
+                ON DUPLICATE KEY UPDATE revoked_at = VALUES(revoked_at), expires_at = VALUES(expires_at)
+    """
+    with engine.begin() as conn:
+        conn.execute(text(query), {"key": key, "now": now, "exp": expires_at})
+        # revocations of tokens that have expired anyway
+        conn.execute(text("DELETE FROM session_revocation WHERE expires_at <= :now"), {"now": now})
 
-    return None
+def revoke_token(token):
+    # logout: the token stops working everywhere until it would have expired
+    claims = _claims(token)
+    if claims is None:
+        return
+    _revoke(f"jti:{claims['jti']}", claims["exp"])
 
+def revoke_user(user_id):
+    # password reset, role change or removal: every token issued so far stops working
+    _revoke(f"uid:{str(user_id).strip()}", time.time() + session_ttl_seconds)
@@ -0,0 +1,79 @@
+import argparse
+import time
+import uuid
+from sqlalchemy import text
+
+import schema_registry
+from crud_functions import (run_query, view, insert, insert_many, delete_many, _select_statement,
+                            _insert_statement)
+from benchmarks.run_benchmarks import _sample
+
+# per-call cost of the generic crud helpers: the statement built with f-strings and
+# text() on every call (as they used to) against the cached statements of
+# schema_registry, then whole calls, then single-row inserts against insert_many.
+# cpu is process time of this process, so database time is left out of it.
+#
+#   python -m benchmarks.crud_statements --repeat 5000
+
+BATCH = 100
+
+def _measure(fn, repeat, warmup=10):
+    for _ in range(warmup):
+        fn()
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return {
+        "cpu_us": round((time.process_time() - cpu) / repeat * 1e6, 2),
+        "wall_us": round((time.perf_counter() - wall) / repeat * 1e6, 2)
+    }
+
+def cases(engine):
+    (product_id, product_name, warehouse_id, warehouse_city), supplier_id, user_id = _sample(engine)
+    table, column = "products", "product_id"
+    # supplier_name is unique, each row gets its own, tagged per run so rows left by an
+    # interrupted run do not collide
+    run = uuid.uuid4().hex[:12]
+    suppliers = [{"supplier_name": f"Benchmark Supplier {run} {i}", "supplier_city": f"Bench {i}"}
+                 for i in range(BATCH)]
+    names = [row["supplier_name"] for row in suppliers]
+
+    def single_inserts():
+        ids = [insert(engine, "suppliers", dict(row)) for row in suppliers]
+        delete_many(engine, "suppliers", "supplier_id", ids)
+
+    def many_insert():
+        insert_many(engine, "suppliers", suppliers)
+        delete_many(engine, "suppliers", "supplier_name", names)
+
+    # (name, callable, repeat divisor): the writes run BATCH rows per call
+    return [
+        ("build.select.fstring", lambda: text(f"SELECT * FROM {table} WHERE {column} = :val"), 1),
+        ("build.select.registry", lambda: _select_statement(engine, table, (), (column,)), 1),
+        ("build.insert.fstring", lambda: text(f"""INSERT INTO suppliers ({", ".join(suppliers[0])})
+                                                   VALUES ({", ".join(f":{k}" for k in suppliers[0])})"""), 1),
+        ("build.insert.registry", lambda: _insert_statement(engine, "suppliers", tuple(suppliers[0])), 1),
+        ("view.fstring", lambda: run_query(engine, f"SELECT * FROM {table} WHERE {column} = :val",
+                                           {"val": product_id}, fetch=True), 1),
+        ("view.registry", lambda: view(engine, table, column, product_id), 1),
+        (f"insert.{BATCH}_single", single_inserts, BATCH),
+        (f"insert.{BATCH}_insert_many", many_insert, BATCH)
+    ]
+
+def run(engine, repeat):
+    results = {}
+    for name, fn, divisor in cases(engine):
+        results[name] = _measure(fn, max(repeat // divisor, 3))
+        print(f"{name:28} cpu {results[name]['cpu_us']:12.2f} us   wall {results[name]['wall_us']:12.2f} us")
+    print(schema_registry.registry.stats())
+    return results
+
+
+if __name__ == "__main__":
+    from db import engine
+
+    parser = argparse.ArgumentParser(description="Per-call cost of the generic CRUD helpers")
+    parser.add_argument("--repeat", type=int, default=2000, help="calls per read benchmark")
+    args = parser.parse_args()
+    run(engine, args.repeat)
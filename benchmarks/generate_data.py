@@ -0,0 +1,170 @@
+import argparse
+import time
+from datetime import date, timedelta
+import numpy as np
+from sqlalchemy import text
+
+import capacity
+import dimensions
+import order_summary
+import query_cache
+from auth import hash_password
+from bulk_load import insert_rows
+
+# seeded synthetic data for the whole schema, for benchmarks on a local database.
+# the same seed and scale always produce the same rows.
+#
+#   python -m benchmarks.generate_data --products 100000 --warehouses 50 \
+#       --movements 10000000 --orders 1000000 --truncate
+
+# child tables first; snapshots go too, or stock_as_of would replay the new ledger on old ones
+TABLES = ["inventory_snapshot_rows", "inventory_snapshot", "inventory_adjustment", "session_revocation",
+          "stock_movement", "payments", "order_items", "order_summary", "orders",
+          "inventory", "products", "warehouse", "suppliers", "users"]
+
+CATEGORIES = ["electronics", "furniture", "grocery", "apparel", "tools", "toys", "books", "sports"]
+
+def _next_id(conn, table, column):
+    return conn.execute(text(f"SELECT COALESCE(MAX({column}), 0) + 1 FROM {table}")).scalar()
+
+def _write(engine, table, columns, arrays, batch=2000):
+    # arrays are column-wise; rows go out as multi-row INSERTs, one transaction per 50k
+    total = len(arrays[0])
+    for start in range(0, total, 50000):
+        rows = list(zip(*(a[start:start + 50000].tolist() for a in arrays)))
+        with engine.begin() as conn:
+            for i in range(0, len(rows), batch):
+                insert_rows(conn, table, columns, rows[i:i + batch], upsert=False)
+    print(f"  {table}: {total} rows")
+
+def generate(engine, seed=42, users=20, suppliers=500, warehouses=50, products=100000,
+             warehouses_per_product=2, orders=1000000, items_per_order=3, payments_per_order=1,
+             movements=10000000, days=365, truncate=False):
+    rng = np.random.default_rng(seed)
+    today = date.today()
+    started = time.perf_counter()
+
+    if truncate:
+        with engine.begin() as conn:
+            conn.execute(text("SET FOREIGN_KEY_CHECKS = 0"))
+            for table in TABLES:
+                conn.execute(text(f"TRUNCATE TABLE {table}"))
+            conn.execute(text("SET FOREIGN_KEY_CHECKS = 1"))
+
+    with engine.begin() as conn:
+        user0 = _next_id(conn, "users", "user_id")
+        supplier0 = _next_id(conn, "suppliers", "supplier_id")
+        warehouse0 = _next_id(conn, "warehouse", "warehouse_id")
+        product0 = _next_id(conn, "products", "product_id")
+        order0 = _next_id(conn, "orders", "order_id")
+
+    # users share one password hash, hashing is deliberately slow
+    password = hash_password("benchmark")
+    ids = np.arange(user0, user0 + users)
+    _write(engine, "users", ["user_id", "username", "role", "email", "password"], [
+        ids,
+        np.array([f"user_{i}" for i in ids]),
+        rng.choice(["admin", "manager", "staff"], users, p=[0.1, 0.3, 0.6]),
+        np.array([f"user_{i}@example.com" for i in ids]),
+        np.full(users, password)
+    ])
+    user_ids = ids
+
+    ids = np.arange(supplier0, supplier0 + suppliers)
+    _write(engine, "suppliers", ["supplier_id", "supplier_name", "supplier_city"], [
+        ids, np.array([f"Supplier {i}" for i in ids]), np.array([f"City {i % 97}" for i in ids])
+    ])
+    supplier_ids = ids
+
+    # capacity large enough that generated stock always fits
+    ids = np.arange(warehouse0, warehouse0 + warehouses)
+    _write(engine, "warehouse", ["warehouse_id", "warehouse_city", "warehouse_total_capacity"], [
+        ids, np.array([f"Warehouse City {i}" for i in ids]), np.full(warehouses, 2_000_000_000)
+    ])
+    warehouse_ids = ids
+
+    ids = np.arange(product0, product0 + products)
+    prices = np.round(rng.uniform(1, 500, products), 2)
+    _write(engine, "products", ["product_id", "product_name", "category", "unit_price", "reorder_level"], [
+        ids, np.array([f"Product {i}" for i in ids]), rng.choice(CATEGORIES, products), prices,
+        rng.integers(10, 200, products)
+    ])
+    product_ids = ids
+
+    # each product stocked in distinct warehouses: random start, consecutive offsets
+    per = min(warehouses_per_product, warehouses)
+    first = rng.integers(0, warehouses, products)
+    pair_products = np.repeat(product_ids, per)
+    pair_warehouses = warehouse_ids[(np.repeat(first, per) + np.tile(np.arange(per), products)) % warehouses]
+    _write(engine, "inventory", ["product_id", "warehouse_id", "stock_left"], [
+        pair_products, pair_warehouses, rng.integers(0, 1000, len(pair_products))
+    ])
+
+    ids = np.arange(order0, order0 + orders)
+    order_dates = np.array([today - timedelta(days=int(d)) for d in rng.integers(0, days, orders)])
+    _write(engine, "orders", ["order_id", "supplier_id", "order_date", "order_status", "created_by"], [
+        ids, rng.choice(supplier_ids, orders), order_dates,
+        rng.choice(["pending", "recieved", "cancelled"], orders, p=[0.3, 0.6, 0.1]), rng.choice(user_ids, orders)
+    ])
+    order_ids = ids
+
+    counts = np.maximum(rng.poisson(items_per_order, orders), 1)
+    item_orders = np.repeat(order_ids, counts)
+    item_products = rng.integers(0, products, len(item_orders))
+    _write(engine, "order_items", ["order_id", "product_id", "quantity_ordered", "unit_price"], [
+        item_orders, product_ids[item_products], rng.integers(1, 100, len(item_orders)), prices[item_products]
+    ])
+
+    counts = rng.poisson(payments_per_order, orders)
+    payment_orders = np.repeat(order_ids, counts)
+    payment_dates = np.repeat(order_dates, counts)
+    _write(engine, "payments", ["order_id", "amount_paid", "payment_status", "payment_date", "recorded_by"], [
+        payment_orders, np.round(rng.uniform(10, 5000, len(payment_orders)), 2),
+        rng.choice(["completed", "pending", "partial"], len(payment_orders)), payment_dates,
+        rng.choice(user_ids, len(payment_orders))
+    ])
+
+    # movements in date order, like a live ledger, generated a chunk at a time
+    chunk = 500000
+    offsets = np.sort(rng.integers(0, days, movements))[::-1]
+    for start in range(0, movements, chunk):
+        n = min(chunk, movements - start)
+        pairs = rng.integers(0, len(pair_products), n)
+        _write(engine, "stock_movement",
+               ["product_id", "warehouse_id", "movement_type", "quantity", "movement_date", "performed_by"], [
+                   pair_products[pairs], pair_warehouses[pairs], rng.choice(["in", "out"], n, p=[0.3, 0.7]),
+                   rng.integers(1, 50, n),
+                   np.array([today - timedelta(days=int(d)) for d in offsets[start:start + n]]),
+                   rng.choice(user_ids, n)
+               ])
+
+    # derived counters
+    print(f"  order_summary: {order_summary.rebuild(engine)['repaired']} orders")
+    print(f"  used_capacity: {len(capacity.rebuild(engine))} warehouses")
+    query_cache.cache.clear()
+    dimensions.cache.invalidate()
+
+    print(f"generated in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    from db import engine
+
+    parser = argparse.ArgumentParser(description="Fill the schema with seeded synthetic data")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--suppliers", type=int, default=500)
+    parser.add_argument("--warehouses", type=int, default=50)
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--warehouses-per-product", type=int, default=2)
+    parser.add_argument("--orders", type=int, default=1000000)
+    parser.add_argument("--items-per-order", type=float, default=3)
+    parser.add_argument("--payments-per-order", type=float, default=1)
+    parser.add_argument("--movements", type=int, default=10000000)
+    parser.add_argument("--days", type=int, default=365, help="history spread over this many days")
+    parser.add_argument("--truncate", action="store_true", help="empty every table first")
+    args = parser.parse_args()
+
+    generate(engine, args.seed, args.users, args.suppliers, args.warehouses, args.products,
+             args.warehouses_per_product, args.orders, args.items_per_order, args.payments_per_order,
+             args.movements, args.days, args.truncate)
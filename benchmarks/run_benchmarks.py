@@ -0,0 +1,168 @@
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from sqlalchemy import text
+
+import dimensions
+import query_cache
+from crud_functions import (run_query, view, insert, delete, get_primarykey, move_stock, move_stock_batch,
+                            adjust_stock, paginate, stock_history, fetch_frame, create_order)
+from grids import GRIDS, ORDERS_OVERVIEW_DTYPES
+from order_summary import ORDERS_OVERVIEW
+
+# times the hot paths against the configured database (run benchmarks.generate_data
+# first) and writes the results as JSON, one file per run, so commits can be compared.
+#
+#   python -m benchmarks.run_benchmarks --repeat 50 --label baseline --output results/baseline.json
+
+def _timings(fn, repeat, warmup=2):
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return times
+
+def _summary(times):
+    ordered = sorted(times)
+    return {
+        "n": len(ordered),
+        "min_ms": round(ordered[0], 3),
+        "p50_ms": round(ordered[len(ordered) // 2], 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        "max_ms": round(ordered[-1], 3),
+        "mean_ms": round(statistics.fmean(ordered), 3)
+    }
+
+def _sample(engine):
+    # one existing product/warehouse pair (with stock), supplier and user to benchmark against
+    query = """SELECT i.product_id, p.product_name, i.warehouse_id, w.warehouse_city
+                FROM inventory i
+                JOIN products p ON p.product_id = i.product_id
+                JOIN warehouse w ON w.warehouse_id = i.warehouse_id
+                WHERE i.stock_left > 0
+                ORDER BY i.inventory_id
+                LIMIT 1
+    """
+    with engine.begin() as conn:
+        pair = conn.execute(text(query)).fetchone()
+        supplier_id = conn.execute(text("SELECT MIN(supplier_id) FROM suppliers")).scalar()
+        user_id = conn.execute(text("SELECT MIN(user_id) FROM users")).scalar()
+    if pair is None or supplier_id is None or user_id is None:
+        raise RuntimeError("no data to benchmark, run python -m benchmarks.generate_data first")
+    return pair, supplier_id, user_id
+
+def benchmarks(engine):
+
+    # name -> callable; every write is paired with its undo so the data set stays the same
+    pair, supplier_id, user_id = _sample(engine)
+    product_id, product_name, warehouse_id, warehouse_city = pair
+    today = date.today()
+
+    def primarykey_raw():
+        run_query(engine, "SELECT product_id FROM products WHERE product_name = :product_name",
+                  {"product_name": product_name}, fetch=True)
+
+    def insert_delete():
+        # supplier_name is unique: a row left behind by an interrupted run must not collide
+        new_id = insert(engine, "suppliers", {"supplier_name": f"Benchmark Supplier {uuid.uuid4().hex}",
+                                              "supplier_city": "Bench"})
+        delete(engine, "suppliers", "supplier_id", new_id)
+
+    def move_in_out():
+        move_stock(engine, product_id, warehouse_id, "in", 1, user_id)
+        move_stock(engine, product_id, warehouse_id, "out", 1, user_id)
+
+    def adjust_in_out():
+        adjust_stock(engine, product_id, warehouse_id, 1, user_id)
+        adjust_stock(engine, product_id, warehouse_id, -1, user_id)
+
+    def create_delete_order():
+        lines = [{"product_name": product_name, "quantity_ordered": 1 + i} for i in range(60)]
+        delete(engine, "orders", "order_id", create_order(engine, supplier_id, lines, user_id))
+
+    batch = [{"product_id": product_id, "warehouse_id": warehouse_id, "movement_type": t, "quantity": 1}
+             for t in ["in", "out"] * 50]
+
+    cases = {
+        "get_primarykey.products": lambda: get_primarykey(engine, "products", "product_id",
+                                                          ["product_name"], [product_name]),
+        "get_primarykey.warehouse": lambda: get_primarykey(engine, "warehouse", "warehouse_id",
+                                                           ["warehouse_city"], [warehouse_city]),
+        "get_primarykey.raw_query": primarykey_raw,
+        "view.products": lambda: view(engine, "products", "product_id", product_id),
+        "view.suppliers": lambda: view(engine, "suppliers", "supplier_id", supplier_id),
+        "insert_delete.suppliers": insert_delete,
+        "move_stock.in_out": move_in_out,
+        "adjust_stock.in_out": adjust_in_out,
+        "move_stock_batch.100": lambda: move_stock_batch(engine, batch, user_id),
+        "create_order.60_lines": create_delete_order,
+        "orders_overview": lambda: run_query(engine, ORDERS_OVERVIEW, fetch=True),
+        "orders_overview.cached": lambda: run_query(engine, ORDERS_OVERVIEW, fetch=True, cache=True),
+        "orders_overview.frame": lambda: fetch_frame(engine, ORDERS_OVERVIEW, dtypes=ORDERS_OVERVIEW_DTYPES),
+        "stock_history.30_days": lambda: stock_history(engine, today - timedelta(days=30), today),
+        "stock_history.30_days.product": lambda: stock_history(engine, today - timedelta(days=30), today,
+                                                               product_id=product_id)
+    }
+
+    # the first page of every "View All" grid, in its default sort order
+    for key, grid in GRIDS.items():
+        cases[f"grid.{key}"] = (lambda grid=grid: paginate(
+            engine, grid["table"], grid["columns"], next(iter(grid["sort_options"].values())),
+            grid["key_column"], descending=grid.get("descending", False)))
+        cases[f"grid.{key}.frame"] = (lambda grid=grid: paginate(
+            engine, grid["table"], grid["columns"], next(iter(grid["sort_options"].values())),
+            grid["key_column"], descending=grid.get("descending", False), as_frame=True, dtypes=grid.get("dtypes")))
+
+    return cases
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(engine, repeat=20, only=None):
+    results = {}
+    for name, fn in benchmarks(engine).items():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        # every benchmark starts cold, cached ones warm up in _timings
+        query_cache.cache.clear()
+        results[name] = _summary(_timings(fn, repeat))
+        print(f"{name:34} p50 {results[name]['p50_ms']:9.3f} ms   p95 {results[name]['p95_ms']:9.3f} ms")
+    dimensions.cache.invalidate()
+    return results
+
+
+if __name__ == "__main__":
+    from db import engine
+
+    parser = argparse.ArgumentParser(description="Time the CRUD and page queries")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per benchmark")
+    parser.add_argument("--only", nargs="*", help="benchmark name prefixes to run")
+    parser.add_argument("--label", default="", help="free text stored with the results")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    report = {
+        "label": args.label,
+        "commit": _commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "repeat": args.repeat,
+        "results": run(engine, args.repeat, args.only)
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {args.output}")
@@ -0,0 +1,235 @@
+import argparse
+import os
+import time
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.exc import DataError, IntegrityError
+
+import dimensions
+import order_summary
+import query_cache
+
+# csv datasets in load order (later ones reference earlier ones by name)
+# lookups: csv name column -> (dimension table, id column it fills in)
+# references: id column -> (table, column) it must exist in, checked before inserting
+DATASETS = {
+    "suppliers": {
+        "file": "Suppliers.csv",
+        "table": "suppliers",
+        "columns": ["supplier_id", "supplier_name", "supplier_phone", "supplier_email", "supplier_city"],
+        "required": ["supplier_name"],
+        "lookups": {},
+        "references": {}
+    },
+    "warehouse": {
+        "file": "Warehouse.csv",
+        "table": "warehouse",
+        "columns": ["warehouse_id", "warehouse_city", "warehouse_total_capacity"],
+        "required": ["warehouse_city", "warehouse_total_capacity"],
+        "lookups": {},
+        "references": {}
+    },
+    "products": {
+        "file": "Products.csv",
+        "table": "products",
+        "columns": ["product_id", "product_name", "category", "unit_price", "is_available", "reorder_level"],
+        "required": ["product_name", "unit_price"],
+        "lookups": {},
+        "references": {}
+    },
+    "orders": {
+        "file": "Orders.csv",
+        "table": "orders",
+        "columns": ["order_id", "supplier_id", "order_date", "order_status", "created_by"],
+        "required": [],
+        "lookups": {"supplier_name": ("suppliers", "supplier_id")},
+        "references": {"supplier_id": ("suppliers", "supplier_id"), "created_by": ("users", "user_id")}
+    },
+    "order_items": {
+        "file": "OrderItems.csv",
+        "table": "order_items",
+        "columns": ["order_item_id", "order_id", "product_id", "quantity_ordered", "unit_price"],
+        "required": ["order_id", "product_id", "quantity_ordered", "unit_price"],
+        "lookups": {"product_name": ("products", "product_id")},
+        "references": {"order_id": ("orders", "order_id"), "product_id": ("products", "product_id")}
+    },
+    "payments": {
+        "file": "Payments.csv",
+        "table": "payments",
+        "columns": ["payment_id", "order_id", "amount_paid", "payment_status", "payment_date", "recorded_by"],
+        "required": ["order_id", "amount_paid", "payment_status"],
+        "lookups": {},
+        "references": {"order_id": ("orders", "order_id"), "recorded_by": ("users", "user_id")}
+    }
+}
+
+def load_csv(engine, path, dataset, chunk_size=50000, upsert=False, rows_per_statement=1000, rejects_path=None):
+
+    # streams the file in chunks of chunk_size lines, so memory stays bounded by the
+    # chunk and not the file; each chunk is resolved, inserted and committed on its own.
+    # a bad row goes to the rejects file with its reason, the rest of the load goes on
+    spec = DATASETS[dataset]
+    table = spec["table"]
+    rejects_path = rejects_path or f"{os.path.splitext(path)[0]}.rejects.csv"
+    if os.path.exists(rejects_path):
+        os.remove(rejects_path)
+
+    stats = {"dataset": dataset, "rows": 0, "loaded": 0, "rejected": 0}
+    started = time.perf_counter()
+
+    for chunk in pd.read_csv(path, chunksize=chunk_size, skipinitialspace=True):
+        chunk.columns = [c.strip().lower() for c in chunk.columns]
+        reasons = pd.Series("", index=chunk.index)
+
+        # foreign keys by name, resolved for the whole chunk at once
+        for name_column, (dimension, id_column) in spec["lookups"].items():
+            if name_column not in chunk:
+                continue
+            names = chunk[name_column].dropna().unique().tolist()
+            ids = dimensions.resolve(engine, dimension, names)
+            chunk[id_column] = chunk[name_column].map(ids)
+            unknown = chunk[name_column].notna() & chunk[id_column].isna()
+            reasons[unknown] += f"unknown {name_column}; "
+
+        for column in spec["required"]:
+            if column not in chunk:
+                reasons += f"missing {column}; "
+            else:
+                reasons[chunk[column].isna()] += f"missing {column}; "
+
+        check_references(engine, chunk, spec["references"], reasons)
+
+        columns = [c for c in spec["columns"] if c in chunk]
+        good = chunk.loc[reasons == "", columns].astype(object)
+        good = good.where(good.notna(), None)
+        rows = list(good.itertuples(index=False, name=None))
+        keys = good.index.tolist()
+
+        with engine.begin() as conn:
+            for start in range(0, len(rows), rows_per_statement):
+                end = start + rows_per_statement
+                for key, reason in insert_or_split(conn, table, columns, rows[start:end], keys[start:end], upsert):
+                    reasons[key] += f"{reason}; "
+
+            if table in order_summary.DETAIL_TABLES:
+                order_summary.refresh(conn, good["order_id"].unique().tolist())
+
+        rejected = reasons != ""
+        if rejected.any():
+            bad = chunk[rejected].assign(reject_reason=reasons[rejected].str.rstrip("; "))
+            bad.to_csv(rejects_path, mode="a", index=False, header=not os.path.exists(rejects_path))
+
+        stats["rows"] += len(chunk)
+        stats["loaded"] += len(chunk) - int(rejected.sum())
+        stats["rejected"] += int(rejected.sum())
+
+    query_cache.invalidate(table, "order_summary")
+    if table in dimensions.DIMENSIONS:
+        dimensions.cache.invalidate(table)
+
+    stats["seconds"] = round(time.perf_counter() - started, 2)
+    stats["rows_per_sec"] = round(stats["rows"] / stats["seconds"]) if stats["seconds"] else stats["rows"]
+    stats["rejects_file"] = rejects_path if stats["rejected"] else None
+    return stats
+
+def check_references(engine, chunk, references, reasons):
+
+    # every id the chunk refers to, looked up with one query; rows pointing at a missing
+    # row are rejected here instead of failing the insert of everything around them
+    selects = []
+    params = {}
+    checked = []
+    for n, (column, (ref_table, ref_column)) in enumerate(references.items()):
+        if column not in chunk:
+            continue
+        values = pd.to_numeric(chunk[column], errors="coerce")
+        reasons[chunk[column].notna() & values.isna()] += f"invalid {column}; "
+        ids = values.dropna().unique().tolist()
+        checked.append((n, column, values))
+        if not ids:
+            continue
+        names = []
+        for i, value in enumerate(ids):
+            params[f"r{n}_{i}"] = int(value)
+            names.append(f":r{n}_{i}")
+        selects.append(f"SELECT {n} AS ref, {ref_column} AS id FROM {ref_table} WHERE {ref_column} IN ({', '.join(names)})")
+
+    found = {}
+    if selects:
+        with engine.begin() as conn:
+            for n, value in conn.execute(text(" UNION ALL ".join(selects)), params):
+                found.setdefault(n, set()).add(value)
+
+    for n, column, values in checked:
+        reasons[values.notna() & ~values.isin(found.get(n, set()))] += f"unknown {column}; "
+
+def insert_or_split(conn, table, columns, rows, keys, upsert):
+
+    # inserts rows under a savepoint; when the database refuses the statement (duplicate
+    # key, out of range or invalid enum value) the rows are retried in halves until the
+    # offending ones are found. returns [(key, reason)] of the rows that were not inserted
+    try:
+        with conn.begin_nested():
+            insert_rows(conn, table, columns, rows, upsert)
+        return []
+    except (IntegrityError, DataError) as e:
+        if len(rows) == 1:
+            return [(keys[0], f"rejected by database: {e.orig}")]
+
+    middle = len(rows) // 2
+    return (insert_or_split(conn, table, columns, rows[:middle], keys[:middle], upsert) +
+            insert_or_split(conn, table, columns, rows[middle:], keys[middle:], upsert))
+
+def insert_rows(conn, table, columns, rows, upsert):
+    if not rows:
+        return
+
+    # one multi-row INSERT per batch of rows
+    params = {}
+    groups = []
+    for i, row in enumerate(rows):
+        names = []
+        for j, value in enumerate(row):
+            params[f"v{i}_{j}"] = value
+            names.append(f":v{i}_{j}")
+        groups.append(f"({', '.join(names)})")
+
+    query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join(groups)}"
+
+    # upsert matches on the table's primary key or unique natural key
+    if upsert:
+        query += " ON DUPLICATE KEY UPDATE " + ", ".join(f"{c} = VALUES({c})" for c in columns)
+
+    conn.execute(text(query), params)
+
+def load_all(engine, data_dir, datasets=None, chunk_size=50000, upsert=False):
+    results = []
+    for name in datasets or DATASETS:
+        path = os.path.join(data_dir, DATASETS[name]["file"])
+        if not os.path.exists(path):
+            print(f"{name}: {path} not found, skipped")
+            continue
+        result = load_csv(engine, path, name, chunk_size=chunk_size, upsert=upsert)
+        print(f"{name}: {result['loaded']} loaded, {result['rejected']} rejected, "
+              f"{result['rows_per_sec']} rows/sec ({result['seconds']}s)")
+        if result["rejects_file"]:
+            print(f"  rejected rows written to {result['rejects_file']}")
+        results.append(result)
+    return results
+
+
+if __name__ == "__main__":
+    from db import engine
+
+    parser = argparse.ArgumentParser(description="Bulk load the csv datasets")
+    parser.add_argument("datasets", nargs="*", help=f"datasets to load: {', '.join(DATASETS)} (default: all, in order)")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--upsert", action="store_true", help="update rows that already exist")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.datasets if name not in DATASETS]
+    if unknown:
+        parser.error(f"unknown dataset(s): {', '.join(unknown)}")
+
+    load_all(engine, args.data_dir, args.datasets or None, args.chunk_size, args.upsert)
@@ -0,0 +1,128 @@
+from sqlalchemy import text
+
+import routing
+
+# warehouse.used_capacity is the maintained SUM(inventory.stock_left) per warehouse.
+# every inventory change adjusts it in the same transaction, inventory rows are
+# always locked before the warehouse row.
+
+def adjust(conn, warehouse_id, delta):
+
+    # a single conditional UPDATE checks and reserves the space, and keeps the
+    # warehouse row locked until the caller commits, so concurrent adds cannot overfill
+    if not delta:
+        return
+
+    if delta < 0:
+        query = """UPDATE warehouse
+                    SET used_capacity = GREATEST(used_capacity + :d, 0)
+                    WHERE warehouse_id = :w
+        """
+        conn.execute(text(query), {"d": delta, "w": warehouse_id})
+        return
+
+    query = """UPDATE warehouse
+                SET used_capacity = used_capacity + :d
+                WHERE warehouse_id = :w AND used_capacity + :d <= warehouse_total_capacity
+    """
+    if conn.execute(text(query), {"d": delta, "w": warehouse_id}).rowcount:
+        return
+
+    row = conn.execute(text("SELECT used_capacity, warehouse_total_capacity FROM warehouse WHERE warehouse_id = :w"),
+                       {"w": warehouse_id}).fetchone()
+    if not row:
+        raise ValueError("warehouse not found")
+    raise ValueError(f"Warehouse capacity exceeded! Current: {row.used_capacity}, Capacity: {row.warehouse_total_capacity}")
+
+def adjust_many(conn, deltas):
+    # warehouse_id -> delta, in id order so concurrent callers lock in the same order
+    for warehouse_id in sorted(deltas):
+        adjust(conn, warehouse_id, deltas[warehouse_id])
+
+def lock(conn, warehouse_ids):
+    # locks and returns {warehouse_id: (used_capacity, warehouse_total_capacity)}
+    ids = sorted(set(warehouse_ids))
+    if not ids:
+        return {}
+    params = {f"w{i}": w for i, w in enumerate(ids)}
+    query = f"""SELECT warehouse_id, used_capacity, warehouse_total_capacity
+                FROM warehouse
+                WHERE warehouse_id IN ({", ".join(f":{name}" for name in params)})
+                ORDER BY warehouse_id
+                FOR UPDATE
+    """
+    return {w: (used, total) for w, used, total in conn.execute(text(query), params)}
+
+def stock_by_warehouse(conn, table, column, value):
+
+    # inventory that disappears when rows of `table` matching column = value are deleted
+    # (directly, or by cascade from products), as negative deltas per warehouse
+    if table == "inventory":
+        where = f"{column} = :val"
+    elif table == "products":
+        where = f"product_id IN (SELECT product_id FROM products WHERE {column} = :val)"
+    else:
+        return {}
+
+    query = f"""SELECT warehouse_id, SUM(stock_left)
+                FROM inventory
+                WHERE {where}
+                GROUP BY warehouse_id
+    """
+    return {w: -int(total) for w, total in conn.execute(text(query), {"val": value}) if total}
+
+def update_deltas(conn, column, value, data):
+
+    # locks the inventory rows an UPDATE is about to rewrite and returns the per
+    # warehouse change it makes (stock_left and warehouse_id may both change)
+    if "stock_left" not in data and "warehouse_id" not in data:
+        return {}
+
+    query = f"SELECT warehouse_id, stock_left FROM inventory WHERE {column} = :val FOR UPDATE"
+    deltas = {}
+    for warehouse_id, stock_left in conn.execute(text(query), {"val": value}):
+        new_warehouse = data.get("warehouse_id", warehouse_id)
+        deltas[warehouse_id] = deltas.get(warehouse_id, 0) - stock_left
+        deltas[new_warehouse] = deltas.get(new_warehouse, 0) + data.get("stock_left", stock_left)
+    return deltas
+
+def utilization(engine):
+    query = """SELECT warehouse_id, warehouse_city, used_capacity, warehouse_total_capacity,
+                      ROUND(100 * used_capacity / warehouse_total_capacity, 1) AS utilization_pct
+                FROM warehouse
+                ORDER BY warehouse_id
+    """
+    with routing.reader(engine).begin() as conn:
+        return conn.execute(text(query)).fetchall()
+
+def rebuild(engine):
+
+    # recompute every counter from inventory, returns the warehouses that were off
+    totals = """SELECT warehouse_id, SUM(stock_left) AS total
+                FROM inventory
+                GROUP BY warehouse_id"""
+
+    with engine.begin() as conn:
+        query = f"""SELECT w.warehouse_id, w.used_capacity, COALESCE(i.total, 0)
+                    FROM warehouse w
+                    LEFT JOIN ({totals}) i ON i.warehouse_id = w.warehouse_id
+                    WHERE w.used_capacity <> COALESCE(i.total, 0)
+        """
+        drifted = conn.execute(text(query)).fetchall()
+
+        query = f"""UPDATE warehouse w
+                    LEFT JOIN ({totals}) i ON i.warehouse_id = w.warehouse_id
+                    SET w.used_capacity = COALESCE(i.total, 0)
+        """
+        conn.execute(text(query))
+
+    return [tuple(row) for row in drifted]
+
+
+if __name__ == "__main__":
+    from db import engine
+
+    # python capacity.py   recompute used_capacity from inventory
+    for warehouse_id, used, actual in rebuild(engine):
+        print(f"warehouse {warehouse_id}: {used} -> {actual}")
+    print("used_capacity up to date")
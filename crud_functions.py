@@ -1,56 +1,312 @@
+import random
+import time
+
+import numpy as np
+import pandas as pd
 from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+import query_cache
+import dimensions
+import order_summary
+import capacity
+import reorder
+import snapshots
+import routing
+import schema_registry
+
+# dtypes for fetch_frame, declared per query against the result column names
+MONEY = "float64"
+MOVEMENT_TYPE = pd.CategoricalDtype(["in", "out"])
+ORDER_STATUS = pd.CategoricalDtype(["pending", "recieved", "cancelled"])
+PAYMENT_STATUS = pd.CategoricalDtype(["completed", "pending", "partial"])
+USER_ROLE = pd.CategoricalDtype(["admin", "staff", "manager"])
+
+def run_query(engine, query, params= None, fetch= False, cache= False):
+
+    # cache=True serves repeated reads from the shared result cache
+    if fetch and cache:
+        key = query_cache.make_key(query, params)
+        rows = query_cache.cache.get(key)
+        if rows is not None:
+            return rows
+        tables = query_cache.tables_in(query)
+        generation = query_cache.cache.generation(tables)
+
+    if fetch:
+        return _read(engine, query, params, cache and (key, tables, generation))
 
-def run_query(engine, query, params= None, fetch= False):
     with engine.begin() as conn:
-        result = conn.execute(text(query), params or {})
-        if fetch:
-            return result.fetchall()
+        conn.execute(text(query), params or {})
+
+    # writes drop cached reads of every table they touch, after the commit
+    query_cache.invalidate(*query_cache.tables_in(query))
+
+def _rows(result):
+    return result.fetchall()
+
+def _read(engine, query, params, cached, fetch=_rows):
+
+    # reads go to the replica when routing allows it. a result that will be cached
+    # must not come from a replica that may not have the latest write yet.
+    # fetch turns the open result into what is returned and cached
+    statement = text(query) if isinstance(query, str) else query
+    read_engine = routing.reader(engine)
+    if cached and read_engine is not engine and \
+            query_cache.cache.written_since(cached[1], routing.replica_max_lag_seconds):
+        read_engine = engine
+
+    try:
+        with read_engine.begin() as conn:
+            rows = fetch(conn.execute(statement, params or {}))
+    except OperationalError:
+        if read_engine is engine:
+            raise
+        # replica unreachable, retry on the primary
+        routing.router.mark_unhealthy()
+        with engine.begin() as conn:
+            rows = fetch(conn.execute(statement, params or {}))
+
+    if cached:
+        query_cache.cache.put(cached[0], rows, cached[1], cached[2])
+    return rows
+
+def _column(values, dtype):
+    # one result column as an array of dtype, or of the type pandas infers
+    if dtype is None:
+        return pd.array(values) if values else np.array(values, dtype=object)
+    if dtype == MONEY:
+        return np.fromiter((np.nan if v is None else float(v) for v in values), dtype=np.float64, count=len(values))
+    if isinstance(dtype, pd.CategoricalDtype):
+        return pd.Categorical(values, dtype=dtype)
+    return pd.array(values, dtype=dtype)
+
+def _frame(columns, rows, dtypes=None):
+    # DataFrame built column by column from result rows, never as an object matrix first
+    dtypes = dtypes or {}
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    return pd.DataFrame({name: _column(list(col), dtypes.get(name)) for name, col in zip(columns, values)},
+                        columns=columns)
+
+def fetch_frame(engine, query, params=None, dtypes=None, cache=False):
+
+    # a DataFrame straight from the cursor: column names come from the result, dtypes
+    # maps result columns to compact dtypes (categoricals for enums, MONEY for prices,
+    # "Int64" for nullable ids); pandas infers the rest
+    if cache:
+        key = ("frame",) + query_cache.make_key(query, params) + (repr(dtypes),)
+        frame = query_cache.cache.get(key)
+        if frame is not None:
+            return frame
+        tables = query_cache.tables_in(query)
+        generation = query_cache.cache.generation(tables)
+
+    return _read(engine, query, params, cache and (key, tables, generation),
+                 lambda result: _frame(list(result.keys()), result.fetchall(), dtypes))
+
+# the generic helpers below take table and column names from their callers: the names
+# are checked against schema_registry and each statement is built once and reused
+
+def _select_statement(engine, table, columns, where_columns):
+    return schema_registry.statement(
+        engine, "select", table, columns,
+        lambda: f"""SELECT {", ".join(columns) or "*"}
+                    FROM {table}
+                    WHERE {" AND ".join(f"{k} = :{k}" for k in where_columns)}""",
+        where_columns)
+
+def _insert_statement(engine, table, columns):
+    return schema_registry.statement(
+        engine, "insert", table, columns,
+        lambda: f"""INSERT INTO {table} ({", ".join(columns)})
+                    VALUES ({", ".join(f":{k}" for k in columns)})""")
+
+def _update_statement(engine, table, where_column, columns):
+    # inventory rows carry a version every write bumps, see adjust_stock; callers cannot
+    # set it, or the SET clause would assign it twice
+    bump = ""
+    if table == "inventory":
+        if "version" in columns:
+            raise ValueError("inventory.version is maintained by the stock writers and cannot be set")
+        bump = ", version = version + 1"
+    return schema_registry.statement(
+        engine, "update", table, columns,
+        lambda: f"""UPDATE {table}
+                    SET {", ".join(f"{k} = :{k}" for k in columns)}{bump}
+                    WHERE {where_column} = :where_value""",
+        (where_column,))
+
+def _delete_statement(engine, table, column):
+    return schema_registry.statement(
+        engine, "delete", table, (),
+        lambda: f"DELETE FROM {table} WHERE {column} = :val",
+        (column,))
 
 def view(engine, table, column, value):
-    query = f"SELECT * FROM {table} WHERE {column} = :val"
-    rows = run_query(engine, query, {"val": value}, fetch= True)
+    rows = _read(engine, _select_statement(engine, table, (), (column,)), {column: value}, None)
     if rows:
         return dict(rows[0]._mapping)
     return None
     
 def insert(engine, table, data):
-    cols = ", ".join(data.keys())
-    vals = ", ".join(f":{k}" for k in data)
-    query = f"""INSERT INTO {table} ({cols})
-                VALUES ({vals})"""
-    run_query(engine, query, data)
+    query = _insert_statement(engine, table, tuple(data))
+
+    orders = {data.get("order_id")} if table in order_summary.DETAIL_TABLES else set()
+
+    with engine.begin() as conn:
+        new_id = conn.execute(query, data).lastrowid
+        order_summary.refresh(conn, orders)
+        if table == "inventory":
+            capacity.adjust(conn, data["warehouse_id"], data.get("stock_left") or 0)
+            snapshots.log_adjustments(conn, [(data["product_id"], data["warehouse_id"], data.get("stock_left"))])
+
+    _invalidate(table, orders)
+    dimensions.cache.on_insert(table, new_id, data)
+    return new_id
 
 def update(engine, table, where_column, where_value, data):
-    set_part = ", ".join(f"{k} = :{k}" for k in data)
-    query = f"""UPDATE {table}
-                SET {set_part}
-                WHERE {where_column} = :where_value
-                """
+    query = _update_statement(engine, table, where_column, tuple(data))
     data["where_value"] = where_value
 
-    run_query(engine, query, data)
+    with engine.begin() as conn:
+        orders = order_summary.orders_touched(conn, table, where_column, where_value, data)
+        deltas = capacity.update_deltas(conn, where_column, where_value, data) if table == "inventory" else {}
+        changes = snapshots.update_changes(conn, where_column, where_value, data) if table == "inventory" else []
+        conn.execute(query, data)
+        order_summary.refresh(conn, orders)
+        capacity.adjust_many(conn, deltas)
+        snapshots.log_adjustments(conn, changes)
+
+    _invalidate(table, orders)
+    dimensions.cache.on_update(table, where_column, where_value, data)
 
 def delete(engine, table, column, value):
-    query = f"DELETE FROM {table} WHERE {column} = :val"
-    run_query(engine, query, {"val": value})
+    query = _delete_statement(engine, table, column)
+
+    with engine.begin() as conn:
+        orders = order_summary.orders_touched(conn, table, column, value)
+        deltas = capacity.stock_by_warehouse(conn, table, column, value)
+        changes = snapshots.delete_changes(conn, table, column, value)
+        conn.execute(query, {"val": value})
+        order_summary.refresh(conn, orders)
+        capacity.adjust_many(conn, deltas)
+        snapshots.log_adjustments(conn, changes)
+
+    _invalidate(table, orders)
+    dimensions.cache.on_delete(table, column, value)
+
+# executemany variants: one cached statement for many rows in a single transaction, with
+# the same bookkeeping as the single-row helpers. returns the number of rows sent
+
+def insert_many(engine, table, rows):
+
+    # rows are dicts with the same keys; pymysql sends the executemany of an
+    # INSERT ... VALUES as multi-row inserts
+    if not rows:
+        return 0
+    columns = tuple(rows[0])
+    if any(tuple(row) != columns for row in rows):
+        raise ValueError("All rows must have the same columns")
+    query = _insert_statement(engine, table, columns)
+
+    orders = {row.get("order_id") for row in rows} if table in order_summary.DETAIL_TABLES else set()
+
+    with engine.begin() as conn:
+        conn.execute(query, rows)
+        order_summary.refresh(conn, orders)
+        if table == "inventory":
+            deltas = {}
+            for row in rows:
+                deltas[row["warehouse_id"]] = deltas.get(row["warehouse_id"], 0) + (row.get("stock_left") or 0)
+            capacity.adjust_many(conn, deltas)
+            snapshots.log_adjustments(conn, [(row["product_id"], row["warehouse_id"], row.get("stock_left"))
+                                             for row in rows])
+
+    _invalidate(table, orders)
+    # executemany does not return the new ids
+    dimensions.cache.invalidate(table)
+    return len(rows)
+
+def update_many(engine, table, where_column, updates):
+
+    # updates are (where_value, data) pairs, every data dict with the same keys and
+    # every where_value matching different rows
+    if not updates:
+        return 0
+    columns = tuple(updates[0][1])
+    if any(tuple(data) != columns for where_value, data in updates):
+        raise ValueError("All updates must set the same columns")
+    query = _update_statement(engine, table, where_column, columns)
+    params = [dict(data, where_value=where_value) for where_value, data in updates]
+
+    with engine.begin() as conn:
+        orders = set()
+        deltas = {}
+        changes = []
+        for where_value, data in updates:
+            orders |= order_summary.orders_touched(conn, table, where_column, where_value, data)
+            if table == "inventory":
+                for warehouse_id, delta in capacity.update_deltas(conn, where_column, where_value, data).items():
+                    deltas[warehouse_id] = deltas.get(warehouse_id, 0) + delta
+                changes += snapshots.update_changes(conn, where_column, where_value, data)
+        conn.execute(query, params)
+        order_summary.refresh(conn, orders)
+        capacity.adjust_many(conn, deltas)
+        snapshots.log_adjustments(conn, changes)
+
+    _invalidate(table, orders)
+    for where_value, data in updates:
+        dimensions.cache.on_update(table, where_column, where_value, data)
+    return len(updates)
+
+def delete_many(engine, table, column, values):
+    if not values:
+        return 0
+    query = _delete_statement(engine, table, column)
+
+    with engine.begin() as conn:
+        orders = set()
+        deltas = {}
+        changes = []
+        for value in values:
+            orders |= order_summary.orders_touched(conn, table, column, value)
+            for warehouse_id, delta in capacity.stock_by_warehouse(conn, table, column, value).items():
+                deltas[warehouse_id] = deltas.get(warehouse_id, 0) + delta
+            changes += snapshots.delete_changes(conn, table, column, value)
+        conn.execute(query, [{"val": value} for value in values])
+        order_summary.refresh(conn, orders)
+        capacity.adjust_many(conn, deltas)
+        snapshots.log_adjustments(conn, changes)
+
+    _invalidate(table, orders)
+    for value in values:
+        dimensions.cache.on_delete(table, column, value)
+    return len(values)
+
+def _invalidate(table, orders=None):
+    # after commit: drop cached reads of the written table and of derived summaries
+    tables = [table, "order_summary"] if orders else [table]
+    if table in ("inventory", "products"):
+        tables.append("warehouse")
+    query_cache.invalidate(*tables)
+    if table in ("inventory", "products", "orders", "order_items"):
+        reorder.reorder_engine.invalidate()
 
 def get_primarykey(engine, table, pk_column, search_columns, search_values):
 
     # search_columns and search_values are list items
     if len(search_columns) != len(search_values):
         raise ValueError("Columns and Values length not equal!")
-    
-    conditions = " AND ".join(f"{k} = :{k}" for k in search_columns)
 
-    query = f"""SELECT {pk_column}
-                FROM {table}
-                WHERE {conditions}
-    """
+    # name -> id lookups on products, warehouse and suppliers come from the dimension cache
+    if dimensions.DIMENSIONS.get(table) == (pk_column, search_columns[0]) and len(search_columns) == 1:
+        return dimensions.cache.lookup(engine, table, search_values[0])
+    
+    query = _select_statement(engine, table, (pk_column,), search_columns)
 
     # zip used to merge the two columns then convert into dict to pass in parameters
     params = dict(zip(search_columns, search_values))
 
-    rows = run_query(engine, query, params, fetch=True)
+    rows = _read(engine, query, params, None)
 
     if rows:
         return rows[0][0]
@@ -58,11 +314,8 @@ def get_primarykey(engine, table, pk_column, search_columns, search_values):
 
 def get_col(engine, table, column_to_get, search_column, search_value):
 
-    query = f"""SELECT {column_to_get}
-                FROM {table}
-                WHERE {search_column} = :value
-    """
-    rows = run_query(engine,query, {"value": search_value}, fetch= True)
+    query = _select_statement(engine, table, (column_to_get,), (search_column,))
+    rows = _read(engine, query, {search_column: search_value}, None)
 
     if rows:
         return rows[0][0]
@@ -72,7 +325,40 @@ def move_stock(engine, product_id, warehouse_id, movement_type, quantity, user_i
     if quantity <= 0:
         raise ValueError("Quantity must be positive")
     
+    # the inventory row is locked before the ledger row is written, see snapshots.py
     with engine.begin() as conn:
+        if movement_type == "in":
+            query= '''
+                UPDATE inventory
+                SET stock_left = stock_left + :q, version = version + 1
+                WHERE product_id = :p and warehouse_id = :w  
+                '''
+
+            updated = conn.execute(text(query), {"q": quantity, "p": product_id, "w": warehouse_id}).rowcount
+
+            if not updated:
+                raise ValueError("No inventory record")
+
+            # stock coming in must fit the warehouse, checked in this transaction
+            capacity.adjust(conn, warehouse_id, quantity)
+
+        else:
+            # checks and takes the stock in one conditional UPDATE, no read-then-lock round trip
+            query = '''
+                UPDATE inventory
+                SET stock_left = stock_left - :q, version = version + 1
+                WHERE product_id = :p and warehouse_id = :w AND stock_left >= :q
+                '''
+
+            updated = conn.execute(text(query), {"q": quantity, "p": product_id, "w": warehouse_id}).rowcount
+
+            if not updated:
+                found = conn.execute(text("SELECT 1 FROM inventory WHERE product_id = :p AND warehouse_id = :w"),
+                                     {"p": product_id, "w": warehouse_id}).fetchone()
+                raise ValueError("Insufficient stock" if found else "No inventory record")
+
+            capacity.adjust(conn, warehouse_id, -quantity)
+
         query = '''
             INSERT INTO stock_movement(product_id, warehouse_id, movement_type, quantity, performed_by)
             VALUES (:p, :w, :t, :q, :u)
@@ -85,33 +371,491 @@ def move_stock(engine, product_id, warehouse_id, movement_type, quantity, user_i
                                 "q": quantity,
                                 "u": user_id         
                                         })
-    
-        if movement_type == "in":
-            query= '''
-                UPDATE inventory
-                SET stock_left = stock_left + :q
-                WHERE product_id = :p and warehouse_id = :w  
-                '''
 
-            conn.execute(text(query), {"q": quantity, "p": product_id, "w": warehouse_id})
+    query_cache.invalidate("stock_movement", "inventory", "warehouse")
+    reorder.reorder_engine.touch([product_id])
+
+# attempts of adjust_stock before it gives up on a row that keeps changing
+CAS_RETRIES = 5
+
+def stock_row(engine, product_id, warehouse_id):
+    # {"inventory_id", "stock_left", "version"} of one inventory row, from the primary:
+    # the version is what a later adjust_stock(expected_version=...) is checked against
+    with engine.begin() as conn:
+        row = conn.execute(text("""SELECT inventory_id, stock_left, version
+                                   FROM inventory
+                                   WHERE product_id = :p AND warehouse_id = :w"""),
+                           {"p": product_id, "w": warehouse_id}).fetchone()
+    return dict(row._mapping) if row else None
+
+def adjust_stock(engine, product_id, warehouse_id, delta, user_id=None, expected_version=None, retries=CAS_RETRIES):
+
+    # signed stock change of one inventory row, posted to the movement ledger as an "in"
+    # or "out" movement. the row is read without a lock and written with a compare-and-set
+    # on its version, so nothing is held while the change is checked. when another writer
+    # got there first the UPDATE matches no row and the change is re-read and retried.
+    # with expected_version the change was computed from the row as the caller saw it: a
+    # newer version is reported as a conflict instead of retried.
+    # returns the new {"stock_left", "version"}
+    if not delta:
+        raise ValueError("Stock is unchanged")
+
+    for attempt in range(retries):
+        # a transaction per attempt: a retry must see the other writer's commit
+        with engine.begin() as conn:
+            row = conn.execute(text("""SELECT stock_left, version
+                                       FROM inventory
+                                       WHERE product_id = :p AND warehouse_id = :w"""),
+                               {"p": product_id, "w": warehouse_id}).fetchone()
+            if not row:
+                raise ValueError("No inventory record")
+            if expected_version is not None and row.version != expected_version:
+                raise ValueError(f"Stock changed since it was read, it is now {row.stock_left}")
+            if row.stock_left + delta < 0:
+                raise ValueError("Insufficient stock")
 
-        else:
             query = """
-                SELECT stock_left
+                UPDATE inventory
+                SET stock_left = :s, version = version + 1
+                WHERE product_id = :p AND warehouse_id = :w AND version = :v
+                """
+            updated = conn.execute(text(query), {"s": row.stock_left + delta, "v": row.version,
+                                                 "p": product_id, "w": warehouse_id}).rowcount
+            if updated:
+                # the row is locked from here, warehouse row and ledger row follow
+                capacity.adjust(conn, warehouse_id, delta)
+                query = """
+                    INSERT INTO stock_movement(product_id, warehouse_id, movement_type, quantity, performed_by)
+                    VALUES (:p, :w, :t, :q, :u)
+                    """
+                conn.execute(text(query), {"p": product_id, "w": warehouse_id, "t": "in" if delta > 0 else "out",
+                                           "q": abs(delta), "u": user_id})
+                break
+
+        # lost the race, back off a little so hot rows do not retry in lockstep
+        time.sleep(random.uniform(0, 0.002 * 2 ** attempt))
+    else:
+        raise ValueError("Inventory record kept changing, try again")
+
+    query_cache.invalidate("stock_movement", "inventory", "warehouse")
+    reorder.reorder_engine.touch([product_id])
+    return {"stock_left": row.stock_left + delta, "version": row.version + 1}
+
+def move_stock_batch(engine, movements, user_id=None, mode="atomic"):
+
+    # movements are dicts with product_id, warehouse_id, movement_type, quantity and an
+    # optional performed_by (defaults to user_id). mode "atomic" rolls back the whole
+    # batch if any line fails, "partial" posts the good lines and reports the rest.
+    if mode not in ("atomic", "partial"):
+        raise ValueError("mode must be 'atomic' or 'partial'")
+
+    results = [{"index": i, "ok": True, "error": None} for i in range(len(movements))]
+
+    def fail(i, error):
+        results[i]["ok"] = False
+        results[i]["error"] = error
+
+    def check_atomic():
+        failed = [r for r in results if not r["ok"]]
+        if failed and mode == "atomic":
+            raise ValueError(f"{len(failed)} of {len(movements)} lines failed, first: line {failed[0]['index'] + 1}: {failed[0]['error']}")
+
+    for i, m in enumerate(movements):
+        if m["movement_type"] not in ("in", "out"):
+            fail(i, "Invalid movement type")
+        elif m["quantity"] <= 0:
+            fail(i, "Quantity must be positive")
+    check_atomic()
+
+    keys = sorted({(m["product_id"], m["warehouse_id"]) for i, m in enumerate(movements) if results[i]["ok"]})
+
+    if keys:
+        with engine.begin() as conn:
+            # lock every affected inventory row in (product_id, warehouse_id) order, so two
+            # batches touching the same rows queue up instead of deadlocking, and read all
+            # their stock in the same statement
+            pairs, params = _values_clause(keys, "k")
+            query = f"""
+                SELECT product_id, warehouse_id, stock_left
                 FROM inventory
-                WHERE product_id = :p AND warehouse_id = :w
+                WHERE (product_id, warehouse_id) IN ({pairs})
+                ORDER BY product_id, warehouse_id
                 FOR UPDATE
                 """
-            
-            result = conn.execute(text(query), {"p": product_id, "w": warehouse_id}).fetchone()
+            stock = {(p, w): s for p, w, s in conn.execute(text(query), params)}
 
-            if not result or result.stock_left < quantity:
-                raise ValueError("Insufficient stock")
+            # then the warehouse rows, for the capacity check on incoming stock
+            space = {w: total - used for w, (used, total) in capacity.lock(conn, [w for p, w in keys]).items()}
 
-            query = '''
-                UPDATE inventory
-                SET stock_left = stock_left - :q
-                WHERE product_id = :p and warehouse_id = :w  
-                '''
-            
-            conn.execute(text(query), {"q": quantity, "p": product_id, "w": warehouse_id})
+            # apply the lines in posting order against the locked stock
+            accepted = []
+            for i, m in enumerate(movements):
+                if not results[i]["ok"]:
+                    continue
+                key = (m["product_id"], m["warehouse_id"])
+                if key not in stock:
+                    fail(i, "No inventory record")
+                    continue
+                if m["movement_type"] == "out":
+                    if stock[key] < m["quantity"]:
+                        fail(i, "Insufficient stock")
+                        continue
+                    stock[key] -= m["quantity"]
+                    space[key[1]] += m["quantity"]
+                else:
+                    if space[key[1]] < m["quantity"]:
+                        fail(i, "Warehouse capacity exceeded")
+                        continue
+                    stock[key] += m["quantity"]
+                    space[key[1]] -= m["quantity"]
+                accepted.append(m)
+
+            check_atomic()
+            _post_movements(conn, accepted, user_id)
+
+        query_cache.invalidate("stock_movement", "inventory", "warehouse")
+        reorder.reorder_engine.touch({m["product_id"] for m in accepted})
+
+    return results
+
+def _post_movements(conn, movements, user_id, chunk_size=1000):
+
+    # ledger rows as multi-row inserts
+    for start in range(0, len(movements), chunk_size):
+        chunk = movements[start:start + chunk_size]
+        values, params = _values_clause([
+            (m["product_id"], m["warehouse_id"], m["movement_type"], m["quantity"], m.get("performed_by", user_id))
+            for m in chunk
+        ], "m")
+        query = f"""
+            INSERT INTO stock_movement(product_id, warehouse_id, movement_type, quantity, performed_by)
+            VALUES {values}
+            """
+        conn.execute(text(query), params)
+
+    # net change per inventory row, applied with one joined update
+    deltas = {}
+    for m in movements:
+        key = (m["product_id"], m["warehouse_id"])
+        sign = 1 if m["movement_type"] == "in" else -1
+        deltas[key] = deltas.get(key, 0) + sign * m["quantity"]
+
+    rows = [(p, w, d) for (p, w), d in sorted(deltas.items()) if d]
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        params = {}
+        selects = []
+        for i, (p, w, d) in enumerate(chunk):
+            selects.append(f"SELECT :p{i} AS product_id, :w{i} AS warehouse_id, :d{i} AS delta")
+            params.update({f"p{i}": p, f"w{i}": w, f"d{i}": d})
+        query = f"""
+            UPDATE inventory i
+            JOIN ({" UNION ALL ".join(selects)}) d
+              ON i.product_id = d.product_id AND i.warehouse_id = d.warehouse_id
+            SET i.stock_left = i.stock_left + d.delta, i.version = i.version + 1
+            """
+        conn.execute(text(query), params)
+
+    # capacity already checked against the locked warehouse rows, apply the net change
+    capacity_deltas = {}
+    for (p, w), d in deltas.items():
+        capacity_deltas[w] = capacity_deltas.get(w, 0) + d
+    for warehouse_id in sorted(capacity_deltas):
+        query = """UPDATE warehouse
+                    SET used_capacity = GREATEST(used_capacity + :d, 0)
+                    WHERE warehouse_id = :w
+        """
+        conn.execute(text(query), {"d": capacity_deltas[warehouse_id], "w": warehouse_id})
+
+def _values_clause(rows, prefix):
+
+    # "(:k0_0, :k0_1), (:k1_0, :k1_1)" plus the matching params for a list of tuples
+    groups = []
+    params = {}
+    for i, row in enumerate(rows):
+        names = []
+        for j, value in enumerate(row):
+            name = f"{prefix}{i}_{j}"
+            names.append(f":{name}")
+            params[name] = value
+        groups.append(f"({', '.join(names)})")
+    return ", ".join(groups), params
+
+def create_order(engine, supplier_id, lines, user_id=None, order_status="pending", chunk_size=1000):
+
+    # a purchase order with all its lines in one transaction. lines are dicts with a
+    # product_id or product_name, quantity_ordered and an optional unit_price (defaults
+    # to the product's current price). every product is resolved in one query and the
+    # items go in as multi-row inserts; any bad line rejects the whole order.
+    errors = []
+    for i, line in enumerate(lines):
+        if line.get("product_id") is None and not line.get("product_name"):
+            errors.append(f"line {i + 1}: product required")
+        elif not line.get("quantity_ordered") or line["quantity_ordered"] <= 0:
+            errors.append(f"line {i + 1}: quantity must be positive")
+        elif line.get("unit_price") is not None and line["unit_price"] < 0:
+            errors.append(f"line {i + 1}: unit price cannot be negative")
+    if errors:
+        raise ValueError("; ".join(errors))
+
+    ids = sorted({line["product_id"] for line in lines if line.get("product_id") is not None})
+    names = sorted({line["product_name"] for line in lines if line.get("product_id") is None})
+
+    with engine.begin() as conn:
+        by_id = {}
+        by_name = {}
+        if lines:
+            params = {}
+            conditions = []
+            if ids:
+                params.update({f"i{n}": v for n, v in enumerate(ids)})
+                conditions.append(f"product_id IN ({', '.join(f':i{n}' for n in range(len(ids)))})")
+            if names:
+                params.update({f"n{n}": v for n, v in enumerate(names)})
+                conditions.append(f"product_name IN ({', '.join(f':n{n}' for n in range(len(names)))})")
+            query = f"""SELECT product_id, product_name, unit_price
+                        FROM products
+                        WHERE {" OR ".join(conditions)}
+            """
+            # product_name is unique (ux_products_product_name), one row per name. the IN
+            # matched through the column's collation, so names are keyed the way dimensions
+            # compares them and "widget" finds "Widget"
+            for product_id, product_name, unit_price in conn.execute(text(query), params):
+                by_id[product_id] = by_name[dimensions._normalize(product_name)] = (product_id, unit_price)
+
+        items = []
+        for i, line in enumerate(lines):
+            if line.get("product_id") is not None:
+                product = by_id.get(line["product_id"])
+            else:
+                product = by_name.get(dimensions._normalize(line["product_name"]))
+            if product is None:
+                errors.append(f"line {i + 1}: unknown product {line.get('product_id') or line['product_name']}")
+                continue
+            unit_price = line["unit_price"] if line.get("unit_price") is not None else product[1]
+            items.append((product[0], line["quantity_ordered"], unit_price))
+        if errors:
+            raise ValueError("; ".join(errors))
+
+        query = """INSERT INTO orders (supplier_id, order_status, created_by)
+                    VALUES (:supplier_id, :order_status, :created_by)
+        """
+        order_id = conn.execute(text(query), {"supplier_id": supplier_id, "order_status": order_status,
+                                              "created_by": user_id}).lastrowid
+
+        for start in range(0, len(items), chunk_size):
+            values, params = _values_clause([(order_id,) + item for item in items[start:start + chunk_size]], "o")
+            query = f"""
+                INSERT INTO order_items (order_id, product_id, quantity_ordered, unit_price)
+                VALUES {values}
+                """
+            conn.execute(text(query), params)
+
+        order_summary.refresh(conn, {order_id})
+
+    query_cache.invalidate("orders", "order_items", "order_summary")
+    reorder.reorder_engine.invalidate()
+    return order_id
+
+# orders.order_status of a received order, as spelled in the schema
+RECEIVED_STATUS = "recieved"
+
+def receive_order(engine, order_id, warehouse_id, user_id=None):
+
+    # posts every line of the order into warehouse_id as stock coming in and marks it
+    # received, in one transaction of set-based statements. the order row is locked first
+    # (new order_items wait on it through their foreign key), so a retried or concurrent
+    # receipt finds the order already received and posts nothing.
+    # returns {"received": whether this call posted it, "lines", "quantity"}
+    with engine.begin() as conn:
+        order = conn.execute(text("SELECT order_status FROM orders WHERE order_id = :o FOR UPDATE"),
+                             {"o": order_id}).fetchone()
+        if order is None:
+            raise ValueError("Order not found")
+        if order.order_status == RECEIVED_STATUS:
+            return {"received": False, "lines": 0, "quantity": 0}
+        if order.order_status == "cancelled":
+            raise ValueError("Order is cancelled")
+
+        params = {"o": order_id, "w": warehouse_id, "u": user_id}
+
+        # creates the missing inventory rows and locks the existing ones in key order,
+        # before the warehouse row and the ledger rows (see capacity.py and snapshots.py)
+        query = """
+            INSERT INTO inventory (product_id, warehouse_id, stock_left)
+            SELECT DISTINCT product_id, :w, 0
+            FROM order_items
+            WHERE order_id = :o
+            ORDER BY product_id
+            ON DUPLICATE KEY UPDATE stock_left = stock_left
+            """
+        conn.execute(text(query), params)
+
+        query = """SELECT COUNT(*) AS line_count, COALESCE(SUM(quantity_ordered), 0) AS total_quantity
+                    FROM order_items
+                    WHERE order_id = :o
+        """
+        totals = conn.execute(text(query), params).fetchone()
+        capacity.adjust(conn, warehouse_id, int(totals.total_quantity))
+
+        # one movement per product, however many lines it has
+        query = """
+            INSERT INTO stock_movement (product_id, warehouse_id, movement_type, quantity, performed_by)
+            SELECT product_id, :w, 'in', SUM(quantity_ordered), :u
+            FROM order_items
+            WHERE order_id = :o
+            GROUP BY product_id
+            HAVING SUM(quantity_ordered) > 0
+            ORDER BY product_id
+            """
+        conn.execute(text(query), params)
+
+        query = """
+            UPDATE inventory i
+            JOIN (SELECT product_id, SUM(quantity_ordered) AS quantity
+                  FROM order_items
+                  WHERE order_id = :o
+                  GROUP BY product_id) r ON r.product_id = i.product_id
+            SET i.stock_left = i.stock_left + r.quantity, i.version = i.version + 1
+            WHERE i.warehouse_id = :w
+            """
+        conn.execute(text(query), params)
+
+        conn.execute(text("UPDATE orders SET order_status = :status WHERE order_id = :o"),
+                     {"status": RECEIVED_STATUS, "o": order_id})
+
+    query_cache.invalidate("orders", "stock_movement", "inventory", "warehouse")
+    reorder.reorder_engine.invalidate()
+    return {"received": True, "lines": totals.line_count, "quantity": int(totals.total_quantity)}
+
+def paginate(engine, table, columns, sort_column, key_column, page_size=50, filters=None,
+             cursor=None, direction="next", descending=False, as_frame=False, dtypes=None):
+
+    # keyset (seek) pagination: rows are ordered by (sort_column, key_column) and a page
+    # continues from the (sort value, key) pair of the previous page's edge row, so the
+    # database seeks on the index instead of scanning and discarding OFFSET rows.
+    # sort_column must be NOT NULL and key_column unique for the cursor to be exact.
+    # as_frame=True returns the rows as a fetch_frame style DataFrame.
+    conditions, params = _filter_conditions(filters)
+
+    # scan forwards for "next" on an ascending grid, backwards for "prev"
+    ascending = (direction == "next") != descending
+    if cursor is not None:
+        op = ">" if ascending else "<"
+        conditions.append(f"({sort_column} {op} :sort_val OR ({sort_column} = :sort_val AND {key_column} {op} :key_val))")
+        params["sort_val"], params["key_val"] = cursor
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    order = "ASC" if ascending else "DESC"
+
+    query = f"""SELECT {", ".join(columns)}, {sort_column} AS _sort_val, {key_column} AS _key_val
+                FROM {table}
+                {where}
+                ORDER BY {sort_column} {order}, {key_column} {order}
+                LIMIT {int(page_size) + 1}
+    """
+    names = []
+    def fetch(result):
+        names[:] = list(result.keys())[:-2]
+        return result.fetchall()
+    rows = _read(engine, query, params, None, fetch)
+
+    # one extra row tells us whether there is anything beyond this page
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if direction == "prev":
+        rows.reverse()
+
+    # the cursor keeps the values as the driver returned them
+    page_rows = [tuple(row)[:-2] for row in rows]
+    return {
+        "rows": _frame(names, page_rows, dtypes) if as_frame else page_rows,
+        "first": (rows[0][-2], rows[0][-1]) if rows else None,
+        "last": (rows[-1][-2], rows[-1][-1]) if rows else None,
+        "has_more": has_more
+    }
+
+# stock movement history, joined for display
+STOCK_HISTORY_TABLE = """stock_movement sm
+        JOIN products p ON sm.product_id = p.product_id
+        JOIN warehouse w ON sm.warehouse_id = w.warehouse_id
+        LEFT JOIN users u ON sm.performed_by = u.user_id"""
+
+STOCK_HISTORY_COLUMNS = ["sm.movement_id", "p.product_name", "w.warehouse_city", "sm.movement_type",
+                         "sm.quantity", "sm.movement_date", "u.username"]
+
+def stock_history_filters(start_date, end_date, product_id=None, warehouse_id=None, movement_type=None):
+
+    # the date window is required: stock_movement is partitioned by month on
+    # movement_date and the range lets mysql read only the partitions it covers
+    if not start_date or not end_date:
+        raise ValueError("A start and end date are required")
+    if end_date < start_date:
+        raise ValueError("End date is before start date")
+
+    filters = {"sm.movement_date": (start_date, end_date)}
+    if product_id:
+        filters["sm.product_id"] = product_id
+    if warehouse_id:
+        filters["sm.warehouse_id"] = warehouse_id
+    if movement_type:
+        filters["sm.movement_type"] = movement_type
+    return filters
+
+def stock_history(engine, start_date, end_date, product_id=None, warehouse_id=None, movement_type=None,
+                  page_size=50, cursor=None, direction="next"):
+    filters = stock_history_filters(start_date, end_date, product_id, warehouse_id, movement_type)
+    return paginate(engine, STOCK_HISTORY_TABLE, STOCK_HISTORY_COLUMNS, "sm.movement_date", "sm.movement_id",
+                    page_size, filters, cursor, direction, descending=True)
+
+def estimate_count(engine, table, filters=None):
+
+    # server-side estimate only: information_schema row stats for a whole table,
+    # the optimizer's EXPLAIN row estimate when filters are applied
+    if not filters:
+        query = """SELECT TABLE_ROWS
+                    FROM information_schema.TABLES
+                    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table
+        """
+        rows = run_query(engine, query, {"table": table}, fetch=True)
+        return int(rows[0][0] or 0) if rows else 0
+
+    conditions, params = _filter_conditions(filters)
+
+    # EXPLAIN gives one row per table read, the first is whichever table the optimizer
+    # starts from. for a join ("stock_movement sm JOIN ...") estimate the base table
+    # alone when every filter is on it, otherwise count the join exactly
+    base = table
+    if " JOIN " in table.upper():
+        base = " ".join(table.split()[:2])
+        alias = base.split()[-1]
+        if not all(column.startswith(f"{alias}.") for column in filters):
+            query = f"SELECT COUNT(*) FROM {table} WHERE {' AND '.join(conditions)}"
+            rows = run_query(engine, query, params, fetch=True)
+            return int(rows[0][0]) if rows else 0
+
+    query = f"EXPLAIN SELECT 1 FROM {base} WHERE {' AND '.join(conditions)}"
+    rows = run_query(engine, query, params, fetch=True)
+    if rows:
+        return int(rows[0]._mapping["rows"] or 0)
+    return 0
+
+def _filter_conditions(filters):
+
+    # filters map a column to a value (equality) or to a (low, high) tuple (inclusive
+    # range, either end may be None)
+    conditions = []
+    params = {}
+    for i, (column, value) in enumerate((filters or {}).items()):
+        if isinstance(value, tuple):
+            low, high = value
+            if low is not None:
+                conditions.append(f"{column} >= :f{i}_low")
+                params[f"f{i}_low"] = low
+            if high is not None:
+                conditions.append(f"{column} <= :f{i}_high")
+                params[f"f{i}_high"] = high
+        else:
+            conditions.append(f"{column} = :f{i}")
+            params[f"f{i}"] = value
+    return conditions, params
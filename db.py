@@ -2,6 +2,10 @@ from sqlalchemy import create_engine
 import os
 from dotenv import load_dotenv
 
+import pool_metrics
+import instrumentation
+import routing
+
 load_dotenv()
 
 db_host = os.getenv("db_host")
@@ -10,6 +14,42 @@ db_name = os.getenv("db_name")
 db_user = os.getenv("db_user")
 db_password = os.getenv("db_password")
 
+# optional read replica, same credentials and database name unless given
+db_replica_host = os.getenv("db_replica_host")
+db_replica_port = os.getenv("db_replica_port", db_port)
+db_replica_user = os.getenv("db_replica_user", db_user)
+db_replica_password = os.getenv("db_replica_password", db_password)
+db_replica_name = os.getenv("db_replica_name", db_name)
+
+# connection pool, sized from env
+db_pool_size = int(os.getenv("db_pool_size", 10))
+db_max_overflow = int(os.getenv("db_max_overflow", 20))
+db_pool_timeout = float(os.getenv("db_pool_timeout", 30))
+# recycle well below mysql's wait_timeout so the server never closes an idle pooled connection first
+db_pool_recycle = int(os.getenv("db_pool_recycle", 1800))
+db_pool_pre_ping = os.getenv("db_pool_pre_ping", "true").lower() in ("1", "true", "yes")
+
+def _create_engine(url, name):
+    metrics = pool_metrics.PoolMetrics(name)
+    new_engine = create_engine(url,
+                               echo =False,
+                               poolclass=metrics.pool_class(),
+                               pool_size=db_pool_size,
+                               max_overflow=db_max_overflow,
+                               pool_timeout=db_pool_timeout,
+                               pool_recycle=db_pool_recycle,
+                               pool_pre_ping=db_pool_pre_ping)
+    metrics.attach(new_engine)
+    if instrumentation.query_metrics:
+        instrumentation.instrument(new_engine)
+    return new_engine
+
 # db connection
-engine = create_engine(f"mysql+pymysql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}",
-                       echo =False)
\ No newline at end of file
+engine = _create_engine(f"mysql+pymysql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}", "primary")
+
+# read-only engine for reporting reads, routed through routing.reader()
+read_engine = None
+if db_replica_host:
+    read_engine = _create_engine(f"mysql+pymysql://{db_replica_user}:{db_replica_password}@{db_replica_host}:{db_replica_port}/{db_replica_name}",
+                                 "replica")
+    routing.configure(engine, read_engine)
@@ -0,0 +1,139 @@
+import os
+import threading
+import time
+from sqlalchemy import text
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# name -> id lookups the pages resolve on every rerun: table -> (pk column, name column)
+DIMENSIONS = {
+    "products": ("product_id", "product_name"),
+    "warehouse": ("warehouse_id", "warehouse_city"),
+    "suppliers": ("supplier_id", "supplier_name")
+}
+
+# full reload interval, picks up writes made outside this process
+dimension_ttl = float(os.getenv("dimension_cache_ttl", 300))
+
+def _normalize(name):
+    # mysql's default collations compare names case-insensitively, and the PAD SPACE
+    # ones ignore trailing spaces
+    return name.rstrip(" ").casefold() if isinstance(name, str) else name
+
+
+class DimensionCache:
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._ids = {}          # table -> {normalized name: [ids, lowest first]}
+        self._names = {}        # table -> {id: name}
+        self._loaded_at = {}
+
+    def _ensure(self, engine, table):
+        loaded_at = self._loaded_at.get(table)
+        if loaded_at is not None and time.monotonic() - loaded_at < self.ttl:
+            return
+
+        pk_column, name_column = DIMENSIONS[table]
+        with engine.begin() as conn:
+            rows = conn.execute(text(f"SELECT {pk_column}, {name_column} FROM {table} ORDER BY {pk_column}")).fetchall()
+
+        ids = {}
+        names = {}
+        for pk, name in rows:
+            ids.setdefault(_normalize(name), []).append(pk)
+            names[pk] = name
+
+        with self._lock:
+            self._ids[table] = ids
+            self._names[table] = names
+            self._loaded_at[table] = time.monotonic()
+
+    def lookup(self, engine, table, name):
+        return self.resolve(engine, table, [name])[name]
+
+    def resolve(self, engine, table, names):
+        # many names in one call, missing names map to None
+        self._ensure(engine, table)
+        with self._lock:
+            ids = self._ids[table]
+            result = {}
+            for name in names:
+                matches = ids.get(_normalize(name))
+                result[name] = matches[0] if matches else None
+            return result
+
+    def names(self, engine, table):
+        self._ensure(engine, table)
+        with self._lock:
+            return list(self._names[table].values())
+
+    def on_insert(self, table, new_id, data):
+        if table not in DIMENSIONS or table not in self._loaded_at:
+            return
+        pk_column, name_column = DIMENSIONS[table]
+        if not new_id or name_column not in data:
+            self.invalidate(table)
+            return
+        with self._lock:
+            self._add(table, new_id, data[name_column])
+
+    def on_update(self, table, where_column, where_value, data):
+        if table not in DIMENSIONS or table not in self._loaded_at:
+            return
+        pk_column, name_column = DIMENSIONS[table]
+        if name_column not in data:
+            return
+        if where_column != pk_column:
+            self.invalidate(table)
+            return
+        with self._lock:
+            self._remove(table, where_value)
+            self._add(table, where_value, data[name_column])
+
+    def on_delete(self, table, column, value):
+        if table not in DIMENSIONS or table not in self._loaded_at:
+            return
+        pk_column, name_column = DIMENSIONS[table]
+        with self._lock:
+            if column == pk_column:
+                self._remove(table, value)
+            elif column == name_column:
+                for pk in self._ids[table].get(_normalize(value), [])[:]:
+                    self._remove(table, pk)
+            else:
+                self.invalidate(table)
+
+    def invalidate(self, table=None):
+        with self._lock:
+            if table is None:
+                self._loaded_at.clear()
+            else:
+                self._loaded_at.pop(table, None)
+
+    def _add(self, table, pk, name):
+        ids = self._ids[table].setdefault(_normalize(name), [])
+        ids.append(pk)
+        ids.sort()
+        self._names[table][pk] = name
+
+    def _remove(self, table, pk):
+        name = self._names[table].pop(pk, None)
+        if name is None:
+            return
+        ids = self._ids[table].get(_normalize(name), [])
+        if pk in ids:
+            ids.remove(pk)
+        if not ids:
+            self._ids[table].pop(_normalize(name), None)
+
+
+cache = DimensionCache(dimension_ttl)
+
+def resolve(engine, table, names):
+    return cache.resolve(engine, table, names)
+
+def names(engine, table):
+    return cache.names(engine, table)
@@ -0,0 +1,177 @@
+import argparse
+import os
+import time
+from datetime import date
+import pandas as pd
+from sqlalchemy import text
+
+import routing
+
+# full-table exports streamed from a server-side cursor in fixed-size chunks, so memory
+# use stays at one chunk whatever the row count. pyarrow is only needed for parquet.
+
+# the app's Download button holds the whole file in server memory while it is served,
+# so in-app exports larger than this are not offered for download
+DOWNLOAD_MAX_MB = int(os.getenv("export_download_max_mb", 50))
+
+# name -> query and the column its optional date window applies to
+EXPORTS = {
+    "inventory": {
+        "query": """SELECT i.inventory_id, i.product_id, p.product_name, i.warehouse_id, w.warehouse_city,
+                           i.stock_left, i.last_restocked
+                    FROM inventory i
+                    JOIN products p ON p.product_id = i.product_id
+                    JOIN warehouse w ON w.warehouse_id = i.warehouse_id
+                    {where}
+                    ORDER BY i.inventory_id""",
+        "date_column": None
+    },
+    # no ORDER BY: rows stream partition by partition, a global sort would need a filesort
+    "stock_movement": {
+        "query": """SELECT movement_id, product_id, warehouse_id, movement_type, quantity, movement_date, performed_by
+                    FROM stock_movement
+                    {where}""",
+        "date_column": "movement_date"
+    },
+    "orders": {
+        "query": """SELECT o.order_id, o.supplier_id, s.supplier_name, o.order_date, o.order_status, o.created_by,
+                           COALESCE(os.item_count, 0) AS item_count, COALESCE(os.order_total, 0) AS order_total,
+                           COALESCE(os.amount_paid, 0) AS amount_paid, COALESCE(os.balance, 0) AS balance,
+                           os.last_payment_date
+                    FROM orders o
+                    LEFT JOIN suppliers s ON s.supplier_id = o.supplier_id
+                    LEFT JOIN order_summary os ON os.order_id = o.order_id
+                    {where}
+                    ORDER BY o.order_id""",
+        "date_column": "o.order_date"
+    },
+    "order_items": {
+        "query": """SELECT oi.order_item_id, oi.order_id, oi.product_id, oi.quantity_ordered, oi.unit_price
+                    FROM order_items oi
+                    JOIN orders o ON o.order_id = oi.order_id
+                    {where}
+                    ORDER BY oi.order_item_id""",
+        "date_column": "o.order_date"
+    },
+    "payments": {
+        "query": """SELECT payment_id, order_id, amount_paid, payment_status, payment_date, recorded_by
+                    FROM payments
+                    {where}
+                    ORDER BY payment_id""",
+        "date_column": "payment_date"
+    }
+}
+
+FORMATS = ("csv", "parquet")
+
+def _query(name, start_date=None, end_date=None):
+    export = EXPORTS[name]
+    conditions = []
+    params = {}
+    if export["date_column"]:
+        if start_date:
+            conditions.append(f"{export['date_column']} >= :start")
+            params["start"] = start_date
+        if end_date:
+            conditions.append(f"{export['date_column']} <= :end")
+            params["end"] = end_date
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return export["query"].format(where=where), params
+
+def _parquet_schema(pa, inferred):
+
+    # the file schema comes from the first chunk: decimals get the widest precision so
+    # later chunks fit, and columns that were all NULL in it are written as text
+    fields = []
+    as_text = []
+    for field in inferred:
+        if pa.types.is_null(field.type):
+            fields.append(pa.field(field.name, pa.string()))
+            as_text.append(field.name)
+        elif pa.types.is_decimal(field.type):
+            fields.append(pa.field(field.name, pa.decimal128(38, field.type.scale)))
+        else:
+            fields.append(field)
+    return pa.schema(fields), as_text
+
+def stream(engine, name, start_date=None, end_date=None, chunk_size=10000):
+
+    # yields DataFrames of at most chunk_size rows (pymysql uses an unbuffered cursor for
+    # stream_results); the connection stays checked out
+    # until the generator is exhausted or closed
+    query, params = _query(name, start_date, end_date)
+    with routing.reader(engine).connect() as conn:
+        result = conn.execution_options(stream_results=True, max_row_buffer=chunk_size).execute(text(query), params)
+        columns = list(result.keys())
+        empty = True
+        for rows in result.partitions(chunk_size):
+            empty = False
+            yield pd.DataFrame(rows, columns=columns)
+        # an empty result still produces a file with the columns
+        if empty:
+            yield pd.DataFrame(columns=columns)
+
+def export(engine, name, path, fmt="csv", start_date=None, end_date=None, chunk_size=10000, progress=None):
+
+    # writes the export to path chunk by chunk; progress(rows_so_far) is called after
+    # every chunk. returns rows, seconds, rows_per_sec and bytes written
+    if name not in EXPORTS:
+        raise ValueError(f"unknown export {name}, expected one of {', '.join(EXPORTS)}")
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown format {fmt}, expected one of {', '.join(FORMATS)}")
+
+    if fmt == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("parquet export needs pyarrow, pip install pyarrow")
+
+    started = time.perf_counter()
+    rows = 0
+    writer = None
+    schema = None
+
+    try:
+        for chunk in stream(engine, name, start_date, end_date, chunk_size):
+            if fmt == "csv":
+                chunk.to_csv(path, mode="a" if writer else "w", header=not writer, index=False)
+                writer = True
+            else:
+                if writer is None:
+                    schema, as_text = _parquet_schema(pa, pa.Table.from_pandas(chunk, preserve_index=False).schema)
+                    writer = pq.ParquetWriter(path, schema)
+                for column in as_text:
+                    chunk[column] = chunk[column].map(lambda v: None if v is None or v != v else str(v))
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            rows += len(chunk)
+            if progress:
+                progress(rows)
+    finally:
+        if fmt == "parquet" and writer is not None:
+            writer.close()
+
+    seconds = time.perf_counter() - started
+    return {
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(rows / seconds) if seconds > 0 else rows,
+        "bytes": os.path.getsize(path) if os.path.exists(path) else 0
+    }
+
+
+if __name__ == "__main__":
+    from db import engine
+
+    parser = argparse.ArgumentParser(description="Stream a table export to CSV or Parquet")
+    parser.add_argument("name", choices=list(EXPORTS))
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS, help="defaults to the file extension")
+    parser.add_argument("--start", type=date.fromisoformat, help="first day, for dated exports")
+    parser.add_argument("--end", type=date.fromisoformat, help="last day, for dated exports")
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    fmt = args.format or ("parquet" if args.path.endswith(".parquet") else "csv")
+    result = export(engine, args.name, args.path, fmt, args.start, args.end, args.chunk_size)
+    print(f"{result['rows']} rows in {result['seconds']}s ({result['rows_per_sec']} rows/sec), {result['bytes']} bytes")
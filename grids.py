@@ -0,0 +1,62 @@
+from crud_functions import STOCK_HISTORY_TABLE, STOCK_HISTORY_COLUMNS, MONEY, MOVEMENT_TYPE, ORDER_STATUS, USER_ROLE
+
+# "View All" grids: what each page pages through with paginate(). kept apart from the
+# pages so the benchmarks run exactly the same queries.
+# sort_options map a label to a NOT NULL sort column, key_column breaks ties.
+# dtypes are the fetch_frame dtypes of the result columns.
+GRIDS = {
+    "inventory": {
+        "table": "inventory",
+        "columns": ["inventory_id", "product_id", "warehouse_id", "stock_left", "last_restocked"],
+        "labels": ["Inventory ID", 'Product ID', 'Warehouse ID','Stock Left', 'Last Restocked'],
+        "key_column": "inventory_id",
+        "sort_options": {"Inventory ID": "inventory_id", "Product ID": "product_id", "Stock Left": "stock_left"},
+        "dtypes": {"stock_left": "Int64"}
+    },
+    "products": {
+        "table": "products",
+        "columns": ["product_id", "product_name", "category", "unit_price", "is_available", "reorder_level"],
+        "labels": ['Product ID','Name','Category','Unit Price', 'Available','Reorder Level'],
+        "key_column": "product_id",
+        "sort_options": {"Product ID": "product_id", "Name": "product_name", "Unit Price": "unit_price"},
+        "dtypes": {"category": "category", "unit_price": MONEY, "is_available": "boolean", "reorder_level": "Int64"}
+    },
+    "warehouse": {
+        "table": "warehouse",
+        "columns": ["warehouse_id", "warehouse_city", "warehouse_total_capacity"],
+        "labels": ['Warehouse ID','Warehouse City', 'Capacity (m²)'],
+        "key_column": "warehouse_id",
+        "sort_options": {"Warehouse ID": "warehouse_id", "City": "warehouse_city", "Capacity": "warehouse_total_capacity"}
+    },
+    "suppliers": {
+        "table": "suppliers",
+        "columns": ["supplier_id", "supplier_name", "supplier_phone", "supplier_email", "supplier_city"],
+        "labels": ['Supplier ID','Name','Phone Number','Email','City'],
+        "key_column": "supplier_id",
+        "sort_options": {"Supplier ID": "supplier_id", "Name": "supplier_name"}
+    },
+    "movements": {
+        "table": STOCK_HISTORY_TABLE,
+        "columns": STOCK_HISTORY_COLUMNS,
+        "labels": ['Movement ID', 'Product', 'Warehouse', 'Type', 'Quantity', 'Date', 'Performed By'],
+        "key_column": "sm.movement_id",
+        "sort_options": {"Date": "sm.movement_date", "Movement ID": "sm.movement_id"},
+        "dtypes": {"warehouse_city": "category", "movement_type": MOVEMENT_TYPE, "quantity": "Int64",
+                   "username": "category"},
+        "count_table": "stock_movement",
+        "descending": True
+    },
+    "users": {
+        "table": "users",
+        "columns": ["user_id", "username", "role", "phone", "date_joined"],
+        "labels": ['User ID','Username','Role','Phone','Date Joined'],
+        "key_column": "user_id",
+        "sort_options": {"User ID": "user_id", "Username": "username", "Date Joined": "date_joined"},
+        "dtypes": {"role": USER_ROLE}
+    }
+}
+
+# fetch_frame dtypes of the order grids outside GRIDS
+ORDERS_OVERVIEW_DTYPES = {"supplier_name": "category", "order_status": ORDER_STATUS, "item_count": "Int64",
+                          "order_total": MONEY, "amount_paid": MONEY, "balance": MONEY}
+ORDER_ITEM_DTYPES = {"quantity_ordered": "Int64", "unit_price": MONEY, "total": MONEY}
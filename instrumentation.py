@@ -0,0 +1,227 @@
+import contextvars
+import logging
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from sqlalchemy import event
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# per-statement latency histograms, slow query log and prometheus text exposition.
+# off by default; when off no engine listeners are registered, so there is no cost.
+query_metrics = os.getenv("query_metrics", "false").lower() in ("1", "true", "yes")
+slow_query_ms = float(os.getenv("slow_query_ms", 500))
+metrics_file = os.getenv("metrics_file")
+metrics_flush_seconds = float(os.getenv("metrics_flush_seconds", 15))
+
+# histogram bucket upper bounds, seconds
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+slow_log = logging.getLogger("wms.slow_query")
+
+# page currently rendering on this script thread
+_page = contextvars.ContextVar("page", default="-")
+
+# [statements, started] of the script run (full app rerun or fragment rerun) in progress
+_run = contextvars.ContextVar("run", default=None)
+
+def set_page(name):
+    _page.set(name)
+
+def current_page():
+    return _page.get()
+
+_patterns = [
+    (re.compile(r"'(?:[^'\\]|\\.|'')*'"), "?"),             # string literals
+    (re.compile(r"%\(\w+\)s|%s|:\w+"), "?"),                 # bound parameters
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),                 # numbers
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(?)"),      # IN (?, ?, ?) and value rows
+    (re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+"), "(?)"),        # multi-row VALUES (?), (?)
+    (re.compile(r"\s+"), " ")
+]
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement):
+    # the statement with literals and parameters stripped, so every call of the same
+    # query shape lands in one series
+    for pattern, replacement in _patterns:
+        statement = pattern.sub(replacement, statement)
+    return statement.strip()
+
+def _redact(parameters, executemany):
+    # parameter names only, never values
+    if executemany:
+        return f"<{len(parameters)} rows>"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{name}: ?" for name in parameters) + "}"
+    return f"<{len(parameters or ())} values>"
+
+
+class QueryStats:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}       # (fingerprint, page) -> [bucket counts..., sum, count, rows, slow]
+        self._last_flush = time.monotonic()
+
+    def record(self, statement, page, seconds, rows, slow):
+        key = (fingerprint(statement), page)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(BUCKETS) + 4)
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    series[i] += 1
+                    break
+            n = len(BUCKETS)
+            series[n] += seconds
+            series[n + 1] += 1
+            series[n + 2] += max(rows, 0)
+            series[n + 3] += slow
+
+            flush = metrics_file and time.monotonic() - self._last_flush >= metrics_flush_seconds
+            if flush:
+                self._last_flush = time.monotonic()
+
+        if flush:
+            self.write(metrics_file)
+
+    def summary(self):
+        # one row per (fingerprint, page), slowest total first
+        n = len(BUCKETS)
+        with self._lock:
+            rows = [{
+                "page": page,
+                "query": query,
+                "calls": s[n + 1],
+                "total_ms": round(1000 * s[n], 1),
+                "avg_ms": round(1000 * s[n] / s[n + 1], 2) if s[n + 1] else 0.0,
+                "rows": s[n + 2],
+                "slow": s[n + 3]
+            } for (query, page), s in self._series.items()]
+        return sorted(rows, key=lambda r: r["total_ms"], reverse=True)
+
+    def prometheus(self):
+        n = len(BUCKETS)
+        lines = [
+            "# HELP wms_query_duration_seconds Database statement latency by query fingerprint and page.",
+            "# TYPE wms_query_duration_seconds histogram"
+        ]
+        rows_lines = [
+            "# HELP wms_query_rows_total Rows returned or affected by query fingerprint and page.",
+            "# TYPE wms_query_rows_total counter"
+        ]
+        slow_lines = [
+            f"# HELP wms_slow_queries_total Statements slower than {slow_query_ms} ms.",
+            "# TYPE wms_slow_queries_total counter"
+        ]
+        with self._lock:
+            for (query, page), s in self._series.items():
+                labels = f'query="{_escape(query[:300])}",page="{_escape(page)}"'
+                cumulative = 0
+                for i, bound in enumerate(BUCKETS):
+                    cumulative += s[i]
+                    lines.append(f'wms_query_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'wms_query_duration_seconds_bucket{{{labels},le="+Inf"}} {s[n + 1]}')
+                lines.append(f"wms_query_duration_seconds_sum{{{labels}}} {s[n]:.6f}")
+                lines.append(f"wms_query_duration_seconds_count{{{labels}}} {s[n + 1]}")
+                rows_lines.append(f"wms_query_rows_total{{{labels}}} {s[n + 2]}")
+                slow_lines.append(f"wms_slow_queries_total{{{labels}}} {s[n + 3]}")
+        return "\n".join(lines + rows_lines + slow_lines) + "\n"
+
+    def write(self, path):
+        # written to a temp file and renamed, so a scraper never reads half a file
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.prometheus())
+        os.replace(tmp, path)
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+stats = QueryStats()
+
+
+class RerunStats:
+
+    # statements and wall time of each script run, by page and section: "app" for a
+    # full rerun, the fragment's name when a fragment reruns on its own. statements are
+    # only counted while query_metrics is on
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}       # (page, section) -> [runs, statements, seconds, max seconds]
+
+    def record(self, page, section, statements, seconds):
+        with self._lock:
+            series = self._series.setdefault((page, section), [0, 0, 0.0, 0.0])
+            series[0] += 1
+            series[1] += statements
+            series[2] += seconds
+            series[3] = max(series[3], seconds)
+
+    def summary(self):
+        with self._lock:
+            rows = [{
+                "page": page,
+                "section": section,
+                "runs": s[0],
+                "avg_queries": round(s[1] / s[0], 1) if query_metrics else None,
+                "avg_ms": round(1000 * s[2] / s[0], 1),
+                "max_ms": round(1000 * s[3], 1)
+            } for (page, section), s in self._series.items()]
+        return sorted(rows, key=lambda r: (r["page"], r["section"] != "app", r["section"]))
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+reruns = RerunStats()
+
+def begin_run():
+    _run.set([0, time.perf_counter()])
+
+def in_run():
+    return _run.get() is not None
+
+def end_run(section="app"):
+    run = _run.get()
+    if run is None:
+        return
+    _run.set(None)
+    reruns.record(_page.get(), section, run[0], time.perf_counter() - run[1])
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - conn.info["query_started"].pop()
+    page = _page.get()
+    slow = seconds * 1000 >= slow_query_ms
+    if slow:
+        slow_log.warning("%.1f ms page=%s rows=%s sql=%s params=%s", seconds * 1000, page,
+                         cursor.rowcount, fingerprint(statement), _redact(parameters, executemany))
+    stats.record(statement, page, seconds, cursor.rowcount, slow)
+    run = _run.get()
+    if run is not None:
+        run[0] += 1
+
+def _handle_error(exception_context):
+    # a failed statement never reaches after_cursor_execute, drop its start time
+    started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+def instrument(engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
@@ -0,0 +1,434 @@
+import logging
+import sys
+from datetime import date
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, ProgrammingError
+
+import order_summary
+import partitions
+import schema_registry
+
+log = logging.getLogger("wms.migrations")
+
+# er model
+# https://dbdiagram.io/d/695ac7f539fa3db27b1180da
+
+# versioned schema: each migration runs once, in order, and is recorded in
+# schema_version. add new migrations at the end of MIGRATIONS, never edit applied ones.
+
+def _index_exists(conn, table, index):
+    query = """SELECT 1
+                FROM information_schema.STATISTICS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t AND INDEX_NAME = :i
+                LIMIT 1
+    """
+    return conn.execute(text(query), {"t": table, "i": index}).fetchone() is not None
+
+def _add_index(conn, table, index, columns, unique=False):
+
+    # online: the table stays readable and writable while the index builds
+    if _index_exists(conn, table, index):
+        return
+
+    if unique:
+        query = f"""SELECT {columns}, COUNT(*)
+                    FROM {table}
+                    GROUP BY {columns}
+                    HAVING COUNT(*) > 1
+                    LIMIT 5
+        """
+        duplicates = conn.execute(text(query)).fetchall()
+        if duplicates:
+            raise RuntimeError(f"cannot add unique index {index}: duplicate {columns} in {table}: "
+                               f"{[tuple(row)[:-1] for row in duplicates]}")
+
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    conn.execute(text(f"ALTER TABLE {table} ADD {kind} {index} ({columns}), ALGORITHM=INPLACE, LOCK=NONE"))
+
+
+def _v1_base_tables(conn):
+    # Users table
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INT PRIMARY KEY AUTO_INCREMENT,
+            username VARCHAR(255) NOT NULL UNIQUE,
+            role ENUM('admin', 'staff', 'manager') NOT NULL,
+            email VARCHAR(255) NOT NULL,
+            phone VARCHAR(20),
+            date_joined DATE NOT NULL DEFAULT (CURRENT_DATE),
+            password VARCHAR(255) NOT NULL
+        )
+    """))
+
+    # Suppliers table
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS suppliers (
+            supplier_id INT PRIMARY KEY AUTO_INCREMENT,
+            supplier_name VARCHAR(255) NOT NULL,
+            supplier_phone VARCHAR(20),
+            supplier_email VARCHAR(255),
+            supplier_city VARCHAR(100)
+        )
+    """))
+
+    # Products table
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS products (
+            product_id INT PRIMARY KEY AUTO_INCREMENT,
+            product_name VARCHAR(255) NOT NULL,
+            category VARCHAR(100),
+            unit_price DECIMAL(10,2) NOT NULL,
+            is_available BOOLEAN DEFAULT TRUE,
+            reorder_level INT
+        )
+    """))
+
+    # Warehouse table
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS warehouse (
+            warehouse_id INT PRIMARY KEY AUTO_INCREMENT,
+            warehouse_city VARCHAR(100) NOT NULL,
+            warehouse_total_capacity INT NOT NULL
+        )
+    """))
+
+    # Orders table
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS orders (
+            order_id INT PRIMARY KEY AUTO_INCREMENT,
+            supplier_id INT,
+            order_date DATE NOT NULL DEFAULT (CURRENT_DATE),
+            order_status ENUM('pending', 'recieved', 'cancelled') NOT NULL DEFAULT 'pending',
+            created_by INT,
+            FOREIGN KEY (supplier_id) REFERENCES suppliers(supplier_id) 
+                ON UPDATE CASCADE ON DELETE SET NULL,
+            FOREIGN KEY (created_by) REFERENCES users(user_id) 
+                ON UPDATE CASCADE ON DELETE SET NULL
+        )
+    """))
+
+    # Order Items table
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS order_items (
+            order_item_id INT PRIMARY KEY AUTO_INCREMENT,
+            order_id INT NOT NULL,
+            product_id INT NOT NULL,
+            quantity_ordered INT NOT NULL,
+            unit_price DECIMAL(10,2) NOT NULL,
+            FOREIGN KEY (order_id) REFERENCES orders(order_id) 
+                ON UPDATE CASCADE ON DELETE CASCADE,
+            FOREIGN KEY (product_id) REFERENCES products(product_id) 
+                ON UPDATE CASCADE ON DELETE CASCADE
+        )
+    """))
+
+    # Payments table
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS payments (
+            payment_id INT PRIMARY KEY AUTO_INCREMENT,
+            order_id INT NOT NULL,
+            amount_paid DECIMAL(10,2) NOT NULL,
+            payment_status ENUM('completed', 'pending', 'partial') NOT NULL,
+            payment_date DATE NOT NULL DEFAULT (CURRENT_DATE),
+            recorded_by INT,
+            FOREIGN KEY (order_id) REFERENCES orders(order_id) 
+                ON UPDATE CASCADE ON DELETE CASCADE,
+            FOREIGN KEY (recorded_by) REFERENCES users(user_id) 
+                ON UPDATE CASCADE ON DELETE SET NULL
+        )
+    """))
+
+    # Order Summary table (maintained from order_items and payments)
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS order_summary (
+            order_id INT PRIMARY KEY,
+            order_total DECIMAL(12,2) NOT NULL DEFAULT 0,
+            amount_paid DECIMAL(12,2) NOT NULL DEFAULT 0,
+            balance DECIMAL(12,2) AS (order_total - amount_paid) STORED,
+            item_count INT NOT NULL DEFAULT 0,
+            last_payment_date DATE,
+            FOREIGN KEY (order_id) REFERENCES orders(order_id) 
+                ON UPDATE CASCADE ON DELETE CASCADE
+        )
+    """))
+
+    # Inventory table
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS inventory (
+            inventory_id INT PRIMARY KEY AUTO_INCREMENT,
+            product_id INT NOT NULL,
+            warehouse_id INT NOT NULL,
+            stock_left INT NOT NULL DEFAULT 0,
+            last_restocked DATETIME DEFAULT CURRENT_TIMESTAMP
+                      ON UPDATE CURRENT_TIMESTAMP,
+            UNIQUE KEY product_warehouse_unique (product_id, warehouse_id),
+            FOREIGN KEY (product_id) REFERENCES products(product_id) 
+                ON UPDATE CASCADE ON DELETE CASCADE,
+            FOREIGN KEY (warehouse_id) REFERENCES warehouse(warehouse_id) 
+                ON UPDATE CASCADE ON DELETE CASCADE
+        )
+    """))
+
+    # Stock Movement table
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS stock_movement (
+            movement_id INT PRIMARY KEY AUTO_INCREMENT,
+            product_id INT NOT NULL,
+            warehouse_id INT NOT NULL,
+            movement_type ENUM('in', 'out') NOT NULL,
+            quantity INT NOT NULL,
+            movement_date DATE NOT NULL DEFAULT (CURRENT_DATE),
+            performed_by INT,
+            FOREIGN KEY (product_id) REFERENCES products(product_id) 
+                ON UPDATE CASCADE ON DELETE CASCADE,
+            FOREIGN KEY (warehouse_id) REFERENCES warehouse(warehouse_id) 
+                ON UPDATE CASCADE ON DELETE CASCADE,
+            FOREIGN KEY (performed_by) REFERENCES users(user_id) 
+                ON UPDATE CASCADE ON DELETE SET NULL
+        )
+    """))
+
+    # totals for orders that existed before order_summary
+    conn.execute(text(f"""
+        INSERT INTO order_summary (order_id, order_total, amount_paid, item_count, last_payment_date)
+        {order_summary.SUMMARY_SELECT.format(where="", outer_where="")}
+        ON DUPLICATE KEY UPDATE order_id = order_summary.order_id
+    """))
+
+def _v2_hot_path_indexes(conn):
+    # names the app resolves to ids are natural keys
+    _add_index(conn, "products", "ux_products_product_name", "product_name", unique=True)
+    _add_index(conn, "warehouse", "ux_warehouse_warehouse_city", "warehouse_city", unique=True)
+    _add_index(conn, "suppliers", "ux_suppliers_supplier_name", "supplier_name", unique=True)
+
+    _add_index(conn, "orders", "ix_orders_order_date", "order_date")
+    _add_index(conn, "order_items", "ix_order_items_order_id", "order_id, product_id")
+    _add_index(conn, "payments", "ix_payments_order_id", "order_id, payment_date")
+
+    _add_index(conn, "stock_movement", "ix_stock_movement_date", "movement_date")
+    _add_index(conn, "stock_movement", "ix_stock_movement_product", "product_id, movement_date")
+    _add_index(conn, "stock_movement", "ix_stock_movement_warehouse", "warehouse_id, movement_date")
+
+def _v3_warehouse_used_capacity(conn):
+    column = conn.execute(text("""SELECT 1
+                                  FROM information_schema.COLUMNS
+                                  WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'warehouse'
+                                    AND COLUMN_NAME = 'used_capacity'
+    """)).fetchone()
+    if not column:
+        conn.execute(text("ALTER TABLE warehouse ADD COLUMN used_capacity INT NOT NULL DEFAULT 0, ALGORITHM=INSTANT"))
+
+    conn.execute(text("""
+        UPDATE warehouse w
+        LEFT JOIN (SELECT warehouse_id, SUM(stock_left) AS total
+                   FROM inventory
+                   GROUP BY warehouse_id) i ON i.warehouse_id = w.warehouse_id
+        SET w.used_capacity = COALESCE(i.total, 0)
+    """))
+
+def _v4_partition_stock_movement(conn):
+
+    # monthly RANGE COLUMNS partitions on movement_date. mysql requires the partition
+    # column in every unique key and does not allow foreign keys on partitioned tables,
+    # so the primary key becomes (movement_id, movement_date) and the foreign keys go;
+    # the app only writes movements for inventory rows it has already checked.
+    # this rebuilds the table once, run it in a quiet window on large databases.
+    partitioned = conn.execute(text("""SELECT 1
+                                       FROM information_schema.PARTITIONS
+                                       WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'stock_movement'
+                                         AND PARTITION_NAME IS NOT NULL
+                                       LIMIT 1
+    """)).fetchone()
+    if partitioned:
+        return
+
+    foreign_keys = conn.execute(text("""SELECT CONSTRAINT_NAME
+                                        FROM information_schema.REFERENTIAL_CONSTRAINTS
+                                        WHERE CONSTRAINT_SCHEMA = DATABASE() AND TABLE_NAME = 'stock_movement'
+    """)).fetchall()
+    for (name,) in foreign_keys:
+        conn.execute(text(f"ALTER TABLE stock_movement DROP FOREIGN KEY {name}"))
+
+    conn.execute(text("""
+        ALTER TABLE stock_movement
+            MODIFY movement_id INT NOT NULL AUTO_INCREMENT,
+            DROP PRIMARY KEY,
+            ADD PRIMARY KEY (movement_id, movement_date)
+    """))
+
+    first = conn.execute(text("SELECT MIN(movement_date) FROM stock_movement")).scalar()
+    conn.execute(text(f"ALTER TABLE stock_movement PARTITION BY RANGE COLUMNS (movement_date) "
+                      f"({partitions.partition_clause(first or date.today(), date.today())})"))
+
+def _v5_inventory_snapshots(conn):
+
+    # inventory_adjustment logs stock_left changes made outside stock movements (direct
+    # inserts, updates and deletes of inventory rows), so snapshots plus the movement and
+    # adjustment ledgers can reconstruct stock at any past date
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS inventory_adjustment (
+            adjustment_id INT PRIMARY KEY AUTO_INCREMENT,
+            product_id INT NOT NULL,
+            warehouse_id INT NOT NULL,
+            delta INT NOT NULL,
+            adjusted_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            performed_by INT,
+            INDEX ix_inventory_adjustment_warehouse (warehouse_id, adjusted_at),
+            INDEX ix_inventory_adjustment_product (product_id, adjusted_at)
+        )
+    """))
+
+    # one row per snapshot with the ledger positions it includes
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS inventory_snapshot (
+            snapshot_id INT PRIMARY KEY AUTO_INCREMENT,
+            taken_at DATETIME NOT NULL,
+            last_movement_id INT NOT NULL,
+            last_adjustment_id INT NOT NULL,
+            row_count INT NOT NULL DEFAULT 0,
+            INDEX ix_inventory_snapshot_taken_at (taken_at)
+        )
+    """))
+
+    # non-zero stock only, clustered by warehouse for whole-warehouse reads
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS inventory_snapshot_rows (
+            snapshot_id INT NOT NULL,
+            warehouse_id INT NOT NULL,
+            product_id INT NOT NULL,
+            stock_left INT NOT NULL,
+            PRIMARY KEY (snapshot_id, warehouse_id, product_id),
+            FOREIGN KEY (snapshot_id) REFERENCES inventory_snapshot(snapshot_id)
+                ON DELETE CASCADE
+        )
+    """))
+
+def _v6_inventory_version(conn):
+    # bumped by every stock write, for compare-and-set adjustments (crud_functions.adjust_stock)
+    column = conn.execute(text("""SELECT 1
+                                  FROM information_schema.COLUMNS
+                                  WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'inventory'
+                                    AND COLUMN_NAME = 'version'
+    """)).fetchone()
+    if not column:
+        conn.execute(text("ALTER TABLE inventory ADD COLUMN version INT NOT NULL DEFAULT 0, ALGORITHM=INSTANT"))
+
+def _v7_session_revocation(conn):
+    # logouts ("jti:<token id>") and per-user revocations ("uid:<user id>", tokens issued
+    # before revoked_at) shared by every app process; rows expire with the tokens they cover
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS session_revocation (
+            revocation_key VARCHAR(64) PRIMARY KEY,
+            revoked_at DOUBLE NOT NULL,
+            expires_at DOUBLE NOT NULL,
+            INDEX ix_session_revocation_expires_at (expires_at)
+        )
+    """))
+
+
+MIGRATIONS = [
+    (1, "base tables", _v1_base_tables),
+    (2, "hot path indexes", _v2_hot_path_indexes),
+    (3, "warehouse used capacity counter", _v3_warehouse_used_capacity),
+    (4, "monthly partitions on stock_movement", _v4_partition_stock_movement),
+    (5, "inventory snapshots and adjustment log", _v5_inventory_snapshots),
+    (6, "inventory row version", _v6_inventory_version),
+    (7, "persisted session revocations", _v7_session_revocation)
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# set once this process has seen the schema at LATEST_VERSION
+_schema_current = False
+
+def current_version(conn):
+    try:
+        return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar()
+    except ProgrammingError:
+        # no schema_version table yet
+        conn.rollback()
+        return 0
+
+def migrate(engine):
+
+    # applies every migration newer than the recorded version, returns the ones applied.
+    # an advisory lock keeps two processes starting at once from migrating together.
+    global _schema_current
+    applied = []
+
+    with engine.connect() as conn:
+        if conn.execute(text("SELECT GET_LOCK('wms_schema_migration', 300)")).scalar() != 1:
+            raise RuntimeError("timed out waiting for another schema migration")
+        try:
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INT PRIMARY KEY,
+                    description VARCHAR(255) NOT NULL,
+                    applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+                )
+            """))
+            conn.commit()
+
+            version = current_version(conn)
+            for number, description, apply in MIGRATIONS:
+                if number <= version:
+                    continue
+                # mysql commits DDL implicitly, so each migration is recorded right after it runs
+                apply(conn)
+                conn.execute(text("INSERT INTO schema_version (version, description) VALUES (:v, :d)"),
+                             {"v": number, "d": description})
+                conn.commit()
+                applied.append((number, description))
+        finally:
+            conn.execute(text("SELECT RELEASE_LOCK('wms_schema_migration')"))
+            conn.commit()
+
+    _schema_current = True
+    if applied:
+        # statements were checked against the old columns
+        schema_registry.registry.reset()
+    return applied
+
+def ensure_schema(engine):
+
+    # startup check: when the schema is current, one SELECT plus the partition check
+    # (DDL only when future months are missing)
+    global _schema_current
+    if _schema_current:
+        return []
+
+    with engine.connect() as conn:
+        version = current_version(conn)
+
+    applied = migrate(engine) if version < LATEST_VERSION else []
+    _schema_current = True
+    _ensure_partitions(engine)
+    return applied
+
+def _ensure_partitions(engine):
+
+    # once per process: empty months ahead of today, so new movements never land in pmax
+    # and partition pruning keeps working. a long-running process also needs the monthly
+    # `python partitions.py maintain` job (see README)
+    try:
+        added = partitions.ensure_future_partitions(engine)
+    except (RuntimeError, DBAPIError) as e:
+        log.warning("stock_movement partition maintenance failed: %s", e)
+        return
+    if added:
+        log.info("added stock_movement partitions %s", ", ".join(added))
+
+
+if __name__ == "__main__":
+    from db import engine
+
+    # python migrations.py            apply pending migrations
+    # python migrations.py --status   show the recorded version
+    if "--status" in sys.argv:
+        with engine.connect() as conn:
+            print(f"schema version {current_version(conn)} of {LATEST_VERSION}")
+    else:
+        applied = migrate(engine)
+        for number, description in applied:
+            print(f"applied {number}: {description}")
+        print(f"schema at version {LATEST_VERSION}")
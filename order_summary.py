@@ -0,0 +1,141 @@
+import sys
+from sqlalchemy import text
+
+# order_summary keeps one row per order with its totals, maintained in the same
+# transaction as every write to order_items or payments
+
+# order_items / payments rows feeding an order's totals
+DETAIL_TABLES = ("order_items", "payments")
+
+# per-order totals computed from the detail tables; items and payments are aggregated
+# separately so several items and several payments do not multiply each other
+SUMMARY_SELECT = """
+    SELECT o.order_id,
+           COALESCE(i.order_total, 0) AS order_total,
+           COALESCE(p.amount_paid, 0) AS amount_paid,
+           COALESCE(i.item_count, 0) AS item_count,
+           p.last_payment_date
+    FROM orders o
+    LEFT JOIN (SELECT order_id,
+                      SUM(quantity_ordered * unit_price) AS order_total,
+                      COUNT(*) AS item_count
+               FROM order_items
+               {where}
+               GROUP BY order_id) i ON i.order_id = o.order_id
+    LEFT JOIN (SELECT order_id,
+                      SUM(amount_paid) AS amount_paid,
+                      MAX(payment_date) AS last_payment_date
+               FROM payments
+               {where}
+               GROUP BY order_id) p ON p.order_id = o.order_id
+    {outer_where}
+"""
+
+# the "All Purchase Orders" grid
+ORDERS_OVERVIEW = """
+    SELECT o.order_id, s.supplier_name, o.order_date, o.order_status,
+           COALESCE(os.item_count, 0) AS item_count, COALESCE(os.order_total, 0) AS order_total,
+           COALESCE(os.amount_paid, 0) AS amount_paid, COALESCE(os.balance, 0) AS balance, os.last_payment_date
+    FROM orders o
+    LEFT JOIN suppliers s ON o.supplier_id = s.supplier_id
+    LEFT JOIN order_summary os ON o.order_id = os.order_id
+    ORDER BY o.order_date DESC
+"""
+
+def _id_list(order_ids):
+    ids = sorted({int(i) for i in order_ids if i is not None})
+    params = {f"o{i}": order_id for i, order_id in enumerate(ids)}
+    return ", ".join(f":{name}" for name in params), params
+
+def orders_touched(conn, table, column, value, data=None):
+
+    # orders whose totals change when rows of `table` matching column = value are
+    # written; read before the write so deleted rows are still visible
+    if table in DETAIL_TABLES:
+        if column == "order_id":
+            orders = {value}
+        else:
+            query = f"SELECT DISTINCT order_id FROM {table} WHERE {column} = :val"
+            orders = {row[0] for row in conn.execute(text(query), {"val": value})}
+        if data and data.get("order_id") is not None:
+            orders.add(data["order_id"])
+        return orders
+
+    # deleting a product cascades to its order lines
+    if table == "products":
+        query = f"""SELECT DISTINCT oi.order_id
+                    FROM order_items oi
+                    JOIN products p ON p.product_id = oi.product_id
+                    WHERE p.{column} = :val
+        """
+        return {row[0] for row in conn.execute(text(query), {"val": value})}
+
+    return set()
+
+def refresh(conn, order_ids):
+
+    # recompute the summary rows of the given orders; INSERT ... SELECT reads the detail
+    # rows with shared locks, so concurrent writers to the same order serialize here
+    ids, params = _id_list(order_ids)
+    if not ids:
+        return
+
+    query = f"""
+        INSERT INTO order_summary (order_id, order_total, amount_paid, item_count, last_payment_date)
+        {SUMMARY_SELECT.format(where=f"WHERE order_id IN ({ids})", outer_where=f"WHERE o.order_id IN ({ids})")}
+        ON DUPLICATE KEY UPDATE
+            order_total = VALUES(order_total),
+            amount_paid = VALUES(amount_paid),
+            item_count = VALUES(item_count),
+            last_payment_date = VALUES(last_payment_date)
+    """
+    conn.execute(text(query), params)
+
+def get_summary(engine, order_id):
+    query = """SELECT order_total, amount_paid, balance, item_count, last_payment_date
+                FROM order_summary
+                WHERE order_id = :oid
+    """
+    with engine.begin() as conn:
+        row = conn.execute(text(query), {"oid": order_id}).fetchone()
+
+    if row:
+        return dict(row._mapping)
+    return {"order_total": 0, "amount_paid": 0, "balance": 0, "item_count": 0, "last_payment_date": None}
+
+def rebuild(engine, repair=True, chunk_size=1000):
+
+    # compare every summary row with the detail tables and optionally fix the ones that
+    # drifted (e.g. order lines removed by a cascading product delete outside the app)
+    query = f"""
+        SELECT e.order_id
+        FROM ({SUMMARY_SELECT.format(where="", outer_where="")}) e
+        LEFT JOIN order_summary s ON s.order_id = e.order_id
+        WHERE s.order_id IS NULL
+           OR s.order_total <> e.order_total
+           OR s.amount_paid <> e.amount_paid
+           OR s.item_count <> e.item_count
+           OR NOT (s.last_payment_date <=> e.last_payment_date)
+    """
+    with engine.begin() as conn:
+        checked = conn.execute(text("SELECT COUNT(*) FROM orders")).scalar()
+        mismatched = [row[0] for row in conn.execute(text(query))]
+
+    repaired = 0
+    if repair:
+        for start in range(0, len(mismatched), chunk_size):
+            chunk = mismatched[start:start + chunk_size]
+            with engine.begin() as conn:
+                refresh(conn, chunk)
+            repaired += len(chunk)
+
+    return {"checked": checked, "mismatched": len(mismatched), "repaired": repaired}
+
+
+if __name__ == "__main__":
+    from db import engine
+
+    # python order_summary.py           verify and repair
+    # python order_summary.py --check   verify only
+    result = rebuild(engine, repair="--check" not in sys.argv)
+    print(f"orders checked: {result['checked']}, mismatched: {result['mismatched']}, repaired: {result['repaired']}")
@@ -0,0 +1,116 @@
+import sys
+from datetime import date
+from sqlalchemy import text
+
+# stock_movement is RANGE COLUMNS partitioned by month on movement_date:
+# p202601 holds January 2026, pmax catches anything past the last monthly partition.
+# keep a few empty months ahead (maintain) so pmax stays empty and splitting it is instant.
+
+TABLE = "stock_movement"
+
+def _month_start(day):
+    return date(day.year, day.month, 1)
+
+def _next_month(day):
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+def partition_name(month_start):
+    return f"p{month_start:%Y%m}"
+
+def _monthly(start, end):
+    # "PARTITION pYYYYMM VALUES LESS THAN ('next month')" for every month start..end
+    month = _month_start(start)
+    clauses = []
+    while month <= end:
+        clauses.append(f"PARTITION {partition_name(month)} VALUES LESS THAN ('{_next_month(month):%Y-%m-%d}')")
+        month = _next_month(month)
+    return clauses
+
+def partition_clause(first_day, today, months_ahead=3):
+    end = today
+    for _ in range(months_ahead):
+        end = _next_month(end)
+    return ", ".join(_monthly(first_day, end) + ["PARTITION pmax VALUES LESS THAN (MAXVALUE)"])
+
+def list_partitions(conn):
+    query = """SELECT PARTITION_NAME, PARTITION_DESCRIPTION, TABLE_ROWS
+                FROM information_schema.PARTITIONS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t AND PARTITION_NAME IS NOT NULL
+                ORDER BY PARTITION_ORDINAL_POSITION
+    """
+    return conn.execute(text(query), {"t": TABLE}).fetchall()
+
+def _monthly_partitions(conn):
+    # (name, first day of month) of the bounded partitions
+    months = []
+    for name, description, rows in list_partitions(conn):
+        if name != "pmax":
+            months.append((name, date(int(name[1:5]), int(name[5:7]), 1)))
+    return months
+
+def ensure_future_partitions(engine, months_ahead=3):
+
+    # splits the empty pmax into the missing months; only pmax is reorganized, the
+    # partitions holding live rows are not touched. returns the partitions added.
+    with engine.connect() as conn:
+        months = _monthly_partitions(conn)
+        if not months:
+            raise RuntimeError(f"{TABLE} is not partitioned, run the migrations first")
+
+        end = date.today()
+        for _ in range(months_ahead):
+            end = _next_month(end)
+
+        clauses = _monthly(_next_month(months[-1][1]), end)
+        if not clauses:
+            return []
+
+        conn.execute(text(f"ALTER TABLE {TABLE} REORGANIZE PARTITION pmax INTO "
+                          f"({', '.join(clauses + ['PARTITION pmax VALUES LESS THAN (MAXVALUE)'])})"))
+    return [clause.split()[1] for clause in clauses]
+
+def drop_before(engine, before):
+
+    # drops whole months that end on or before `before`; a metadata operation, no row
+    # deletes and no locks on the remaining partitions. returns the partitions dropped.
+    with engine.connect() as conn:
+        old = [name for name, month in _monthly_partitions(conn) if _next_month(month) <= before]
+        if old:
+            conn.execute(text(f"ALTER TABLE {TABLE} DROP PARTITION {', '.join(old)}"))
+    return old
+
+def archive_partition(engine, name):
+
+    # swaps the partition's rows into a standalone table stock_movement_<name> with
+    # EXCHANGE PARTITION (no row copy), leaving the partition empty for drop_before
+    archive = f"{TABLE}_{name}"
+    with engine.connect() as conn:
+        if name not in [n for n, month in _monthly_partitions(conn)]:
+            raise ValueError(f"no partition {name} on {TABLE}")
+        conn.execute(text(f"CREATE TABLE {archive} LIKE {TABLE}"))
+        conn.execute(text(f"ALTER TABLE {archive} REMOVE PARTITIONING"))
+        conn.execute(text(f"ALTER TABLE {TABLE} EXCHANGE PARTITION {name} WITH TABLE {archive}"))
+    return archive
+
+
+if __name__ == "__main__":
+    from db import engine
+
+    # python partitions.py list
+    # python partitions.py maintain [months_ahead]
+    # python partitions.py archive p202401
+    # python partitions.py drop-before 2024-07-01
+    command = sys.argv[1] if len(sys.argv) > 1 else "list"
+
+    if command == "maintain":
+        added = ensure_future_partitions(engine, int(sys.argv[2]) if len(sys.argv) > 2 else 3)
+        print(f"added: {', '.join(added) or 'nothing'}")
+    elif command == "archive":
+        print(f"{sys.argv[2]} moved to {archive_partition(engine, sys.argv[2])}")
+    elif command == "drop-before":
+        dropped = drop_before(engine, date.fromisoformat(sys.argv[2]))
+        print(f"dropped: {', '.join(dropped) or 'nothing'}")
+    else:
+        with engine.connect() as conn:
+            for name, description, rows in list_partitions(conn):
+                print(f"{name:10} < {description:14} ~{rows} rows")
@@ -0,0 +1,109 @@
+import threading
+import time
+from collections import deque
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+# live connection pool figures per engine, shown on the admin status page
+registry = {}
+
+
+class PoolMetrics:
+
+    def __init__(self, name, window=60):
+        self.name = name
+        self.window = window
+        self.engine = None
+        self._lock = threading.Lock()
+        self._connects = deque()            # connect timestamps inside the window
+        self._waits = deque(maxlen=1000)    # recent checkout wait times, seconds
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        registry[name] = self
+
+    def pool_class(self):
+
+        # QueuePool that times how long a checkout waits for a free connection;
+        # there is no pool event for that, everything else comes from events
+        metrics = self
+
+        class TimedQueuePool(QueuePool):
+            def _do_get(self):
+                started = time.perf_counter()
+                try:
+                    return super()._do_get()
+                except exc.TimeoutError:
+                    with metrics._lock:
+                        metrics.timeouts += 1
+                    raise
+                finally:
+                    metrics._record_wait(time.perf_counter() - started)
+
+        return TimedQueuePool
+
+    def attach(self, engine):
+        self.engine = engine
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "invalidate", self._on_invalidate)
+
+    def _record_wait(self, seconds):
+        with self._lock:
+            self._waits.append(seconds)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        now = time.monotonic()
+        with self._lock:
+            self.connects += 1
+            self._connects.append(now)
+            while self._connects and self._connects[0] < now - self.window:
+                self._connects.popleft()
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checkins += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def status(self):
+        now = time.monotonic()
+        with self._lock:
+            while self._connects and self._connects[0] < now - self.window:
+                self._connects.popleft()
+            waits = sorted(self._waits)
+            status = {
+                "engine": self.name,
+                "connects": self.connects,
+                "connects_per_sec": round(len(self._connects) / self.window, 3),
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(1000 * sum(waits) / len(waits), 2) if waits else 0.0,
+                "wait_p95_ms": round(1000 * waits[int(0.95 * (len(waits) - 1))], 2) if waits else 0.0,
+                "wait_max_ms": round(1000 * waits[-1], 2) if waits else 0.0
+            }
+
+        if self.engine is not None:
+            # engine.pool, not a saved reference: dispose() swaps in a new pool
+            pool = self.engine.pool
+            status.update({
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow()
+            })
+        return status
+
+def all_status():
+    return [metrics.status() for metrics in registry.values()]
@@ -0,0 +1,154 @@
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# process wide, so every streamlit session shares the same entries
+cache_max_bytes = int(os.getenv("query_cache_max_bytes", 64 * 1024 * 1024))
+cache_ttl = float(os.getenv("query_cache_ttl", 300))
+
+# tables a statement reads from or writes to
+_table_pattern = re.compile(r"\b(?:FROM|JOIN|INTO|UPDATE)\s+`?(\w+)`?", re.IGNORECASE)
+
+def tables_in(query):
+    return {name.lower() for name in _table_pattern.findall(query)}
+
+def make_key(query, params):
+    return (" ".join(query.split()), repr(sorted((params or {}).items())))
+
+def _estimate_size(rows):
+    if isinstance(rows, pd.DataFrame):
+        return int(rows.memory_usage(index=True, deep=True).sum())
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row)
+        for value in row:
+            size += sys.getsizeof(value)
+    return size
+
+
+class QueryCache:
+
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()       # key -> (expires_at, size, rows, tables)
+        self._keys_by_table = {}            # table -> set of keys
+        self._generations = {}              # table -> write counter
+        self._written_at = {}               # table -> time of the last invalidation
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            # callers get their own list (or frame), the cached rows are shared
+            if isinstance(entry[2], pd.DataFrame):
+                return entry[2].copy(deep=False)
+            return list(entry[2])
+
+    def generation(self, tables):
+        with self._lock:
+            return tuple(self._generations.get(t, 0) for t in sorted(tables))
+
+    def written_since(self, tables, seconds):
+        # whether any of the tables was written in the last `seconds`
+        cutoff = time.monotonic() - seconds
+        with self._lock:
+            return any(self._written_at.get(t, cutoff) > cutoff for t in tables)
+
+    def put(self, key, rows, tables, generation):
+        # rows is a list of result rows or a fetch_frame DataFrame
+        if not isinstance(rows, pd.DataFrame):
+            rows = tuple(rows)
+        size = _estimate_size(rows)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            # a write committed while the query was running, the rows may be stale
+            if generation != tuple(self._generations.get(t, 0) for t in sorted(tables)):
+                return
+
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (time.monotonic() + self.ttl, size, rows, tables)
+            self._bytes += size
+            for table in tables:
+                self._keys_by_table.setdefault(table, set()).add(key)
+
+            # least recently used entries go first
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, *tables):
+        with self._lock:
+            for table in tables:
+                table = table.lower()
+                self._generations[table] = self._generations.get(table, 0) + 1
+                self._written_at[table] = time.monotonic()
+                for key in list(self._keys_by_table.pop(table, ())):
+                    if key in self._entries:
+                        self._remove(key)
+                        self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_table.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations
+            }
+
+    def _remove(self, key):
+        expires_at, size, rows, tables = self._entries.pop(key)
+        self._bytes -= size
+        for table in tables:
+            keys = self._keys_by_table.get(table)
+            if keys:
+                keys.discard(key)
+
+
+cache = QueryCache(cache_max_bytes, cache_ttl)
+
+def invalidate(*tables):
+    cache.invalidate(*tables)
@@ -0,0 +1,215 @@
+import os
+import threading
+import time
+import numpy as np
+from sqlalchemy import text
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# products at or below their reorder_level (total stock over all warehouses), and the
+# purchase order lines that would bring them back up. the whole catalogue is evaluated
+# in one vectorized pass over arrays; after that only products touched by stock
+# movements are re-read, every other write that affects the result triggers a reload.
+
+# suggested lines order up to reorder_level * reorder_target_factor
+reorder_target_factor = float(os.getenv("reorder_target_factor", 2))
+# full reload interval, picks up writes made outside this process
+reorder_ttl = float(os.getenv("reorder_ttl", 300))
+
+# orders with this status count as stock on its way
+OPEN_STATUS = "pending"
+
+_STOCK_QUERY = """
+    SELECT product_id, warehouse_id, stock_left
+    FROM inventory
+    {where}
+"""
+
+_PRODUCTS_QUERY = """
+    SELECT product_id, product_name, COALESCE(reorder_level, -1)
+    FROM products
+    {where}
+    ORDER BY product_id
+"""
+
+_ON_ORDER_QUERY = """
+    SELECT oi.product_id, SUM(oi.quantity_ordered)
+    FROM order_items oi
+    JOIN orders o ON o.order_id = oi.order_id
+    WHERE o.order_status = :open {where}
+    GROUP BY oi.product_id
+"""
+
+# products have no supplier column, the supplier of the latest order is the one to reorder from
+_SUPPLIER_QUERY = """
+    SELECT product_id, supplier_id
+    FROM (SELECT oi.product_id, o.supplier_id,
+                 ROW_NUMBER() OVER (PARTITION BY oi.product_id ORDER BY o.order_date DESC, o.order_id DESC) AS rn
+          FROM order_items oi
+          JOIN orders o ON o.order_id = oi.order_id
+          WHERE o.supplier_id IS NOT NULL {where}) latest
+    WHERE rn = 1
+"""
+
+def _id_filter(column, product_ids):
+    params = {f"r{i}": p for i, p in enumerate(product_ids)}
+    return f"{column} IN ({', '.join(f':{name}' for name in params)})", params
+
+def _positions(ids, keys):
+    # index of each key in the sorted ids, and which keys are there at all
+    pos = np.searchsorted(ids, keys)
+    known = pos < len(ids)
+    known[known] = ids[pos[known]] == keys[known]
+    return pos, known
+
+def _pairs(conn, query, params):
+    rows = conn.execute(text(query), params).fetchall()
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    a = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    b = np.fromiter((r[1] for r in rows), dtype=np.int64, count=len(rows))
+    return a, b
+
+
+class ReorderEngine:
+
+    def __init__(self, ttl, target_factor):
+        self.ttl = ttl
+        self.target_factor = target_factor
+        self._lock = threading.RLock()
+        self._loaded_at = None
+        self._dirty = set()
+        self.full_loads = 0
+        self.partial_loads = 0
+
+        # parallel arrays, one entry per product, sorted by product_id
+        self.product_ids = np.empty(0, dtype=np.int64)
+        self.names = np.empty(0, dtype=object)
+        self.levels = np.empty(0, dtype=np.int64)          # -1: no reorder level
+        self.stock = np.empty(0, dtype=np.int64)           # over all warehouses
+        self.on_order = np.empty(0, dtype=np.int64)
+        self.suppliers = np.empty(0, dtype=np.int64)       # -1: never ordered
+
+    def _load(self, conn, product_ids=None):
+
+        # reads products, stock rows, open order quantities and suppliers, all of them
+        # or only product_ids, and returns them as arrays aligned on product_id
+        if product_ids is None:
+            where, params = "", {}
+            and_where = ""
+        else:
+            where, params = _id_filter("product_id", product_ids)
+            and_where = "AND " + _id_filter("oi.product_id", product_ids)[0]
+            where = "WHERE " + where
+        params["open"] = OPEN_STATUS
+
+        rows = conn.execute(text(_PRODUCTS_QUERY.format(where=where)), params).fetchall()
+        ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+        names = np.array([r[1] for r in rows], dtype=object)
+        levels = np.fromiter((r[2] for r in rows), dtype=np.int64, count=len(rows))
+
+        def per_product(keys, values):
+            # sums values onto the product positions, rows of unknown products are dropped
+            pos, known = _positions(ids, keys)
+            return np.bincount(pos[known], weights=values[known], minlength=len(ids)).astype(np.int64)
+
+        # stock per (product, warehouse) row, summed per product
+        rows = conn.execute(text(_STOCK_QUERY.format(where=where)), params).fetchall()
+        keys = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+        values = np.fromiter((r[2] for r in rows), dtype=np.int64, count=len(rows))
+        stock = per_product(keys, values)
+
+        on_order = per_product(*_pairs(conn, _ON_ORDER_QUERY.format(where=and_where), params))
+
+        suppliers = np.full(len(ids), -1, dtype=np.int64)
+        keys, values = _pairs(conn, _SUPPLIER_QUERY.format(where=and_where), params)
+        pos, known = _positions(ids, keys)
+        suppliers[pos[known]] = values[known]
+
+        return ids, names, levels, stock, on_order, suppliers
+
+    def _ensure(self, engine):
+        with self._lock:
+            stale = self._loaded_at is None or time.monotonic() - self._loaded_at >= self.ttl
+            dirty = sorted(self._dirty)
+            self._dirty.clear()
+
+        if stale:
+            with engine.begin() as conn:
+                arrays = self._load(conn)
+            with self._lock:
+                (self.product_ids, self.names, self.levels, self.stock,
+                 self.on_order, self.suppliers) = arrays
+                self._loaded_at = time.monotonic()
+                self.full_loads += 1
+            return
+
+        if not dirty:
+            return
+
+        with engine.begin() as conn:
+            ids, names, levels, stock, on_order, suppliers = self._load(conn, dirty)
+
+        with self._lock:
+            pos, known = _positions(self.product_ids, ids)
+            if len(ids) != len(dirty) or not known.all():
+                # a product appeared or disappeared, rebuild the arrays
+                self._loaded_at = None
+                self._dirty.update(dirty)
+            else:
+                self.levels[pos] = levels
+                self.stock[pos] = stock
+                self.on_order[pos] = on_order
+                self.suppliers[pos] = suppliers
+                self.partial_loads += 1
+
+        if self._loaded_at is None:
+            self._ensure(engine)
+
+    def evaluate(self, engine):
+
+        # one pass over every product: at or below the reorder level, and the quantity
+        # that brings stock plus open orders up to the target level
+        self._ensure(engine)
+        with self._lock:
+            low = (self.levels >= 0) & (self.stock <= self.levels)
+            target = np.ceil(self.levels * self.target_factor).astype(np.int64)
+            suggested = np.maximum(target - self.stock - self.on_order, 0)
+            idx = np.flatnonzero(low)
+            return [{
+                "product_id": int(self.product_ids[i]),
+                "product_name": self.names[i],
+                "stock_left": int(self.stock[i]),
+                "reorder_level": int(self.levels[i]),
+                "on_order": int(self.on_order[i]),
+                "suggested_quantity": int(suggested[i]),
+                "supplier_id": int(self.suppliers[i]) if self.suppliers[i] >= 0 else None
+            } for i in idx[np.argsort(self.stock[idx] - self.levels[idx], kind="stable")]]
+
+    def suggestions(self, engine):
+        # suggested purchase order lines grouped by supplier_id (None: no order history)
+        grouped = {}
+        for line in self.evaluate(engine):
+            if line["suggested_quantity"] > 0:
+                grouped.setdefault(line["supplier_id"], []).append(line)
+        return grouped
+
+    def touch(self, product_ids):
+        # stock of these products changed; only they are re-read on the next evaluate
+        with self._lock:
+            self._dirty.update(int(p) for p in product_ids)
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+            self._dirty.clear()
+
+
+reorder_engine = ReorderEngine(reorder_ttl, reorder_target_factor)
+
+def low_stock(engine):
+    return reorder_engine.evaluate(engine)
+
+def suggestions(engine):
+    return reorder_engine.suggestions(engine)
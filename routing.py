@@ -0,0 +1,174 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError
+from dotenv import load_dotenv
+
+load_dotenv()
+
+log = logging.getLogger("wms.routing")
+
+# reads may go to a replica while it is less than replica_max_lag_seconds behind; lag is
+# measured at most every replica_lag_check_seconds. a session that wrote reads from the
+# primary for replica_max_lag_seconds afterwards, so it always sees its own writes.
+replica_max_lag_seconds = float(os.getenv("replica_max_lag_seconds", 5))
+replica_lag_check_seconds = float(os.getenv("replica_lag_check_seconds", 2))
+
+# streamlit session (or other caller) the current thread works for
+_session = contextvars.ContextVar("session", default=None)
+# forced primary reads inside pinned()
+_pinned = contextvars.ContextVar("pinned", default=False)
+
+def set_session(session_id):
+    _session.set(session_id)
+
+@contextmanager
+def pinned():
+    # every read in the block goes to the primary
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+class ReplicaRouter:
+
+    def __init__(self, primary, replica, max_lag, check_interval):
+        self.primary = primary
+        self.replica = replica
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._lag = None                # seconds behind, None: unknown or not replicating
+        self._checked_at = None
+        self._last_write = {}           # session -> time of its last committed write
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.fallbacks = 0
+
+        # a committed transaction that wrote anything pins the session to the primary. the
+        # flag lives on the pooled connection, so a rollback or a return to the pool drops
+        # it: otherwise the next session to commit on that connection would be pinned
+        event.listen(primary, "before_cursor_execute", self._on_execute)
+        event.listen(primary, "commit", self._on_commit)
+        event.listen(primary, "rollback", self._on_rollback)
+        event.listen(primary.pool, "checkin", self._on_checkin)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip()[:6].upper().startswith(("SELECT", "SHOW", "EXPLAI", "WITH")):
+            conn.info["wrote"] = True
+
+    def _on_commit(self, conn):
+        if conn.info.pop("wrote", False):
+            self.wrote()
+
+    def _on_rollback(self, conn):
+        conn.info.pop("wrote", None)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        connection_record.info.pop("wrote", None)
+
+    def wrote(self):
+        now = time.monotonic()
+        with self._lock:
+            self._last_write[_session.get()] = now
+            # forget sessions whose pin expired long ago
+            if len(self._last_write) > 10000:
+                self._last_write = {s: t for s, t in self._last_write.items() if now - t < self.max_lag}
+
+    def lag(self):
+
+        # replica lag in seconds, re-measured at most every check_interval; None when the
+        # replica cannot be reached or its replication threads are not running
+        with self._lock:
+            if self._checked_at is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return self._lag
+            self._checked_at = time.monotonic()
+
+        lag = None
+        try:
+            with self.replica.connect() as conn:
+                try:
+                    row = conn.execute(text("SHOW REPLICA STATUS")).mappings().fetchone()
+                    key = "Seconds_Behind_Source"
+                except DBAPIError:
+                    # mysql before 8.0.22
+                    row = conn.execute(text("SHOW SLAVE STATUS")).mappings().fetchone()
+                    key = "Seconds_Behind_Master"
+            if row is not None and row[key] is not None:
+                lag = float(row[key])
+        except DBAPIError as e:
+            log.warning("replica lag check failed: %s", e)
+
+        with self._lock:
+            self._lag = lag
+        return lag
+
+    def healthy(self):
+        lag = self.lag()
+        return lag is not None and lag <= self.max_lag
+
+    def mark_unhealthy(self):
+        # a read failed on the replica: use the primary until the next lag check
+        with self._lock:
+            self._lag = None
+            self._checked_at = time.monotonic()
+
+    def reader(self, engine):
+
+        # the engine a read on `engine` should use
+        if engine is not self.primary:
+            return engine
+
+        if _pinned.get():
+            self.primary_reads += 1
+            return self.primary
+
+        with self._lock:
+            last_write = self._last_write.get(_session.get())
+        if last_write is not None and time.monotonic() - last_write < self.max_lag:
+            self.primary_reads += 1
+            return self.primary
+
+        if not self.healthy():
+            self.fallbacks += 1
+            self.primary_reads += 1
+            return self.primary
+
+        self.replica_reads += 1
+        return self.replica
+
+    def status(self):
+        return {
+            "lag_seconds": self._lag,
+            "max_lag_seconds": self.max_lag,
+            "healthy": self._lag is not None and self._lag <= self.max_lag,
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "lag_fallbacks": self.fallbacks
+        }
+
+
+# set up by db.py when a replica is configured
+router = None
+
+def configure(primary, replica):
+    global router
+    router = ReplicaRouter(primary, replica, replica_max_lag_seconds, replica_lag_check_seconds)
+
+def reader(engine):
+    # the replica for reads on the primary engine when it is usable, else engine itself
+    return router.reader(engine) if router is not None else engine
+
+def wrote():
+    # for writes committed elsewhere on behalf of this session (e.g. queued postings)
+    if router is not None:
+        router.wrote()
+
+def status():
+    return router.status() if router is not None else None
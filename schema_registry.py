@@ -0,0 +1,110 @@
+import threading
+import time
+from sqlalchemy import text
+
+# the tables and columns of the connected database, read from information_schema once,
+# and the text() statements the generic crud helpers build from them. every table and
+# column name a helper splices into sql is checked against the registry first, and the
+# statement for an (operation, table, columns) combination is built only once.
+
+# an unknown name re-reads the schema (a migration may have added it), at most this often
+RELOAD_SECONDS = 30
+
+# more distinct statements than this and the cache starts over
+MAX_STATEMENTS = 2048
+
+_COLUMNS_QUERY = """
+    SELECT TABLE_NAME, COLUMN_NAME
+    FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE()
+    ORDER BY TABLE_NAME, ORDINAL_POSITION
+"""
+
+
+class SchemaRegistry:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tables = None             # table -> tuple of column names
+        self._loaded_at = None
+        self._statements = {}           # (operation, table, columns, where) -> TextClause
+        self.loads = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self, engine):
+        with engine.begin() as conn:
+            rows = conn.execute(text(_COLUMNS_QUERY)).fetchall()
+
+        tables = {}
+        for table, column in rows:
+            tables.setdefault(table, []).append(column)
+
+        with self._lock:
+            self._tables = {table: tuple(columns) for table, columns in tables.items()}
+            self._loaded_at = time.monotonic()
+            self.loads += 1
+
+    def _unknown(self, table, columns):
+        known = self._tables.get(table)
+        if known is None:
+            return f"unknown table {table!r}"
+        for column in columns:
+            if column not in known:
+                return f"unknown column {column!r} in {table}"
+        return None
+
+    def check(self, engine, table, columns=()):
+        # raises ValueError unless the table and every column exist
+        if self._tables is None:
+            self._load(engine)
+        error = self._unknown(table, columns)
+        if error and time.monotonic() - self._loaded_at >= RELOAD_SECONDS:
+            self._load(engine)
+            error = self._unknown(table, columns)
+        if error:
+            raise ValueError(error)
+
+    def columns(self, engine, table):
+        self.check(engine, table)
+        return self._tables[table]
+
+    def statement(self, engine, operation, table, columns, build, where=()):
+
+        # the text() statement for operation on table, columns and where columns; build()
+        # returns its sql and is only called, after the names are checked, the first time
+        key = (operation, table, tuple(columns), tuple(where))
+        statement = self._statements.get(key)
+        if statement is not None:
+            self.hits += 1
+            return statement
+
+        self.check(engine, table, key[2] + key[3])
+        statement = text(build())
+        with self._lock:
+            if len(self._statements) >= MAX_STATEMENTS:
+                self._statements.clear()
+            self._statements[key] = statement
+            self.misses += 1
+        return statement
+
+    def reset(self):
+        # forget the schema and every statement, e.g. after a migration
+        with self._lock:
+            self._tables = None
+            self._statements.clear()
+
+    def stats(self):
+        return {
+            "tables": len(self._tables or {}),
+            "statements": len(self._statements),
+            "hits": self.hits,
+            "misses": self.misses,
+            "loads": self.loads
+        }
+
+
+registry = SchemaRegistry()
+
+def statement(engine, operation, table, columns, build, where=()):
+    return registry.statement(engine, operation, table, columns, build, where)
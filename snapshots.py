@@ -0,0 +1,191 @@
+import sys
+from datetime import date, datetime, timedelta
+from sqlalchemy import text
+
+import routing
+
+# point-in-time stock: periodic copies of inventory (inventory_snapshot_rows) record the
+# stock_movement and inventory_adjustment ids they already include, so stock on a past
+# day is the nearest earlier snapshot plus the ledger rows after it, up to that day.
+#
+# this relies on every stock writer locking the inventory row before it writes its
+# ledger row (movement or adjustment): a snapshot holds shared locks on all of
+# inventory while it reads the ledger positions, so a ledger row is either included in
+# the copied stock and at or below the recorded id, or committed after it with a higher id.
+
+def _ledger_rows(conn, table, column, value):
+
+    # (product_id, warehouse_id, stock_left) of the inventory rows a write to `table`
+    # matching column = value changes or removes (directly or by cascade), locked
+    if table == "inventory":
+        where = f"{column} = :val"
+    elif table == "products":
+        where = f"product_id IN (SELECT product_id FROM products WHERE {column} = :val)"
+    elif table == "warehouse":
+        where = f"warehouse_id IN (SELECT warehouse_id FROM warehouse WHERE {column} = :val)"
+    else:
+        return []
+
+    query = f"SELECT product_id, warehouse_id, stock_left FROM inventory WHERE {where} FOR UPDATE"
+    return conn.execute(text(query), {"val": value}).fetchall()
+
+def update_changes(conn, column, value, data):
+    # per row stock changes an UPDATE of inventory makes, read before it runs
+    if not {"stock_left", "product_id", "warehouse_id"} & data.keys():
+        return []
+    changes = []
+    for product_id, warehouse_id, stock_left in _ledger_rows(conn, "inventory", column, value):
+        changes.append((product_id, warehouse_id, -stock_left))
+        changes.append((data.get("product_id", product_id), data.get("warehouse_id", warehouse_id),
+                        data.get("stock_left", stock_left)))
+    return changes
+
+def delete_changes(conn, table, column, value):
+    # stock removed by deleting rows of inventory, products or warehouse, read before it runs
+    return [(p, w, -s) for p, w, s in _ledger_rows(conn, table, column, value)]
+
+def log_adjustments(conn, changes, user_id=None):
+
+    # changes are (product_id, warehouse_id, delta); opposite deltas on the same row cancel
+    net = {}
+    for product_id, warehouse_id, delta in changes:
+        net[(product_id, warehouse_id)] = net.get((product_id, warehouse_id), 0) + (delta or 0)
+
+    rows = [(p, w, d) for (p, w), d in sorted(net.items()) if d]
+    if not rows:
+        return
+
+    params = {"u": user_id}
+    values = []
+    for i, (p, w, d) in enumerate(rows):
+        values.append(f"(:p{i}, :w{i}, :d{i}, :u)")
+        params.update({f"p{i}": p, f"w{i}": w, f"d{i}": d})
+    query = f"""INSERT INTO inventory_adjustment (product_id, warehouse_id, delta, performed_by)
+                VALUES {", ".join(values)}
+    """
+    conn.execute(text(query), params)
+
+def take_snapshot(engine):
+
+    # copies inventory under shared row locks (stock writes wait for the copy to commit,
+    # run it in a quiet period) and records the ledger positions it includes
+    with engine.begin() as conn:
+        snapshot_id = conn.execute(text("""INSERT INTO inventory_snapshot (taken_at, last_movement_id, last_adjustment_id)
+                                           VALUES (NOW(), 0, 0)""")).lastrowid
+
+        # lock every row first: INSERT ... SELECT alone does not lock under READ COMMITTED
+        conn.execute(text("SELECT COUNT(*) FROM inventory FOR SHARE"))
+
+        # zero rows are dropped after the copy
+        query = """INSERT INTO inventory_snapshot_rows (snapshot_id, warehouse_id, product_id, stock_left)
+                    SELECT :sid, warehouse_id, product_id, stock_left
+                    FROM inventory
+                    ORDER BY inventory_id
+        """
+        conn.execute(text(query), {"sid": snapshot_id})
+        conn.execute(text("DELETE FROM inventory_snapshot_rows WHERE snapshot_id = :sid AND stock_left = 0"),
+                     {"sid": snapshot_id})
+
+        query = """UPDATE inventory_snapshot
+                    SET taken_at = NOW(),
+                        last_movement_id = (SELECT COALESCE(MAX(movement_id), 0) FROM stock_movement),
+                        last_adjustment_id = (SELECT COALESCE(MAX(adjustment_id), 0) FROM inventory_adjustment),
+                        row_count = (SELECT COUNT(*) FROM inventory_snapshot_rows WHERE snapshot_id = :sid)
+                    WHERE snapshot_id = :sid
+        """
+        conn.execute(text(query), {"sid": snapshot_id})
+    return snapshot_id
+
+def list_snapshots(engine):
+    query = """SELECT snapshot_id, taken_at, last_movement_id, last_adjustment_id, row_count
+                FROM inventory_snapshot
+                ORDER BY taken_at DESC
+    """
+    with engine.begin() as conn:
+        return conn.execute(text(query)).fetchall()
+
+def prune(engine, keep_days):
+    # drops snapshots older than keep_days, always keeping the latest one
+    query = """DELETE FROM inventory_snapshot
+                WHERE taken_at < :before
+                  AND snapshot_id <> (SELECT latest FROM (SELECT MAX(snapshot_id) AS latest FROM inventory_snapshot) s)
+    """
+    with engine.begin() as conn:
+        return conn.execute(text(query), {"before": datetime.now() - timedelta(days=keep_days)}).rowcount
+
+def stock_as_of(engine, day, warehouse_id=None, product_id=None):
+
+    # stock_left per (product_id, warehouse_id) at the end of `day`, optionally for one
+    # warehouse and/or product. without a snapshot before that day the ledgers are
+    # replayed from the start, which misses direct stock edits made before
+    # inventory_adjustment existed.
+    end = datetime.combine(day + timedelta(days=1), datetime.min.time())
+
+    conditions = []
+    params = {"day": day, "end": end}
+    if warehouse_id is not None:
+        conditions.append("warehouse_id = :w")
+        params["w"] = warehouse_id
+    if product_id is not None:
+        conditions.append("product_id = :p")
+        params["p"] = product_id
+    extra = "".join(f" AND {c}" for c in conditions)
+
+    with routing.reader(engine).begin() as conn:
+        snapshot = conn.execute(text("""SELECT snapshot_id, taken_at, last_movement_id, last_adjustment_id
+                                        FROM inventory_snapshot
+                                        WHERE taken_at < :end
+                                        ORDER BY taken_at DESC
+                                        LIMIT 1"""), {"end": end}).fetchone()
+
+        parts = []
+        if snapshot:
+            params.update({"sid": snapshot.snapshot_id, "mid": snapshot.last_movement_id,
+                           "aid": snapshot.last_adjustment_id, "since": snapshot.taken_at.date()})
+            parts.append(f"""SELECT product_id, warehouse_id, stock_left AS qty
+                             FROM inventory_snapshot_rows
+                             WHERE snapshot_id = :sid{extra}""")
+        else:
+            params.update({"mid": 0, "aid": 0, "since": date(1000, 1, 1)})
+
+        # the movement_date bound keeps the replay to the partitions after the snapshot
+        parts.append(f"""SELECT product_id, warehouse_id,
+                                SUM(CASE movement_type WHEN 'in' THEN quantity ELSE -quantity END) AS qty
+                         FROM stock_movement
+                         WHERE movement_id > :mid AND movement_date >= :since AND movement_date <= :day{extra}
+                         GROUP BY product_id, warehouse_id""")
+        parts.append(f"""SELECT product_id, warehouse_id, SUM(delta) AS qty
+                         FROM inventory_adjustment
+                         WHERE adjustment_id > :aid AND adjusted_at >= :since AND adjusted_at < :end{extra}
+                         GROUP BY product_id, warehouse_id""")
+
+        query = f"""SELECT product_id, warehouse_id, SUM(qty) AS stock_left
+                    FROM ({" UNION ALL ".join(parts)}) ledger
+                    GROUP BY product_id, warehouse_id
+                    HAVING SUM(qty) <> 0
+                    ORDER BY warehouse_id, product_id
+        """
+        return conn.execute(text(query), params).fetchall()
+
+
+if __name__ == "__main__":
+    from db import engine
+
+    # python snapshots.py take
+    # python snapshots.py list
+    # python snapshots.py as-of 2026-01-31 [warehouse_id] [product_id]
+    # python snapshots.py prune 90
+    command = sys.argv[1] if len(sys.argv) > 1 else "list"
+
+    if command == "take":
+        print(f"snapshot {take_snapshot(engine)} taken")
+    elif command == "as-of":
+        warehouse = int(sys.argv[3]) if len(sys.argv) > 3 else None
+        product = int(sys.argv[4]) if len(sys.argv) > 4 else None
+        for product_id, warehouse_id, stock_left in stock_as_of(engine, date.fromisoformat(sys.argv[2]), warehouse, product):
+            print(f"product {product_id:8} warehouse {warehouse_id:6} stock {stock_left}")
+    elif command == "prune":
+        print(f"{prune(engine, int(sys.argv[2]))} snapshots removed")
+    else:
+        for snapshot_id, taken_at, movement_id, adjustment_id, rows in list_snapshots(engine):
+            print(f"{snapshot_id:6} {taken_at}  movements <= {movement_id}  adjustments <= {adjustment_id}  {rows} rows")
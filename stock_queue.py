@@ -0,0 +1,220 @@
+import atexit
+import itertools
+import numbers
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy.exc import OperationalError
+from dotenv import load_dotenv
+
+import routing
+from crud_functions import move_stock_batch
+
+load_dotenv()
+
+# asynchronous stock posting: callers enqueue movements and get a Ticket back, one
+# background worker commits the queued movements in groups through move_stock_batch.
+# a group is closed after stock_queue_window_ms or once it holds stock_queue_batch_size
+# movements; every movement in it is checked against the locked stock in posting order,
+# so the insufficient-stock and capacity checks are the same as for move_stock.
+stock_queue_batch_size = int(os.getenv("stock_queue_batch_size", 500))
+stock_queue_window_ms = float(os.getenv("stock_queue_window_ms", 10))
+stock_queue_max_pending = int(os.getenv("stock_queue_max_pending", 10000))
+
+# a group rolled back by a deadlock or lock wait timeout is retried as a whole
+RETRIES = 3
+
+# finished tickets kept for polling by id
+KEEP_TICKETS = 10000
+
+
+class Ticket:
+
+    def __init__(self, ticket_id, movements):
+        self.id = ticket_id
+        self.movements = movements
+        self.status = "queued"      # queued -> committed | failed
+        self.results = None         # per movement {"index", "ok", "error"} once committed
+        self.error = None           # why the whole group failed
+        self._done = threading.Event()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        # results once the group is committed; raises if it failed or is still queued
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"ticket {self.id} still queued")
+        if self.status == "failed":
+            raise RuntimeError(f"ticket {self.id} failed: {self.error}")
+        return self.results
+
+    def _finish(self, status, results=None, error=None):
+        self.status = status
+        self.results = results
+        self.error = error
+        self._done.set()
+
+
+class StockQueue:
+
+    def __init__(self, engine, batch_size=stock_queue_batch_size, window_ms=stock_queue_window_ms,
+                 max_pending=stock_queue_max_pending):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.window = window_ms / 1000
+        self._queue = queue.Queue(max_pending)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._tickets = OrderedDict()
+        self.groups = 0
+        self.movements = 0
+        self.failed_groups = 0
+        self.retries = 0
+        self._worker = threading.Thread(target=self._run, name="stock-queue", daemon=True)
+        self._worker.start()
+
+    def submit(self, movements, user_id=None):
+
+        # movements as for move_stock_batch; blocks while max_pending tickets are queued.
+        # malformed lines refuse this ticket here, they would otherwise fail the whole group
+        for i, m in enumerate(movements):
+            error = _invalid(m)
+            if error:
+                raise ValueError(f"line {i + 1}: {error}")
+        movements = [dict(m, performed_by=m.get("performed_by", user_id)) for m in movements]
+        ticket = Ticket(next(self._ids), movements)
+        with self._lock:
+            self._tickets[ticket.id] = ticket
+            while len(self._tickets) > KEEP_TICKETS:
+                oldest = next(iter(self._tickets.values()))
+                if not oldest.done():
+                    break
+                self._tickets.popitem(last=False)
+        if movements:
+            self._queue.put(ticket)
+            # the caller reads its own postings from the primary
+            routing.wrote()
+        else:
+            ticket._finish("committed", [])
+        return ticket
+
+    def ticket(self, ticket_id):
+        with self._lock:
+            return self._tickets.get(ticket_id)
+
+    def close(self, timeout=None):
+        # commits what is already queued, then stops the worker
+        self._queue.put(None)
+        self._worker.join(timeout)
+
+    def stats(self):
+        return {
+            "pending": self._queue.qsize(),
+            "groups": self.groups,
+            "movements": self.movements,
+            "avg_group_size": round(self.movements / self.groups, 1) if self.groups else 0.0,
+            "failed_groups": self.failed_groups,
+            "retries": self.retries
+        }
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                break
+
+            # collect more tickets until the window closes or the group is full
+            group = [first]
+            count = len(first.movements)
+            deadline = time.monotonic() + self.window
+            while count < self.batch_size:
+                try:
+                    ticket = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if ticket is None:
+                    stopping = True
+                    break
+                group.append(ticket)
+                count += len(ticket.movements)
+
+            self._commit(group)
+
+    def _commit(self, group):
+        movements = [m for ticket in group for m in ticket.movements]
+        for attempt in range(RETRIES + 1):
+            try:
+                results = move_stock_batch(self.engine, movements, mode="partial")
+                break
+            except OperationalError as e:
+                # nothing was committed; deadlocks and lock wait timeouts are worth another go
+                if attempt < RETRIES and e.orig is not None and e.orig.args and e.orig.args[0] in (1205, 1213):
+                    self.retries += 1
+                    continue
+                self._fail(group, e)
+                return
+            except Exception as e:
+                self._fail(group, e)
+                return
+
+        self.groups += 1
+        self.movements += len(movements)
+
+        # hand each ticket its own slice, indexed from 0 again
+        start = 0
+        for ticket in group:
+            own = results[start:start + len(ticket.movements)]
+            ticket._finish("committed", [dict(r, index=r["index"] - start) for r in own])
+            start += len(ticket.movements)
+
+    def _fail(self, group, error):
+        self.failed_groups += 1
+        for ticket in group:
+            ticket._finish("failed", error=str(error))
+
+
+def _is_int(value):
+    return isinstance(value, numbers.Integral) and not isinstance(value, bool)
+
+def _invalid(m):
+    # why a movement cannot be posted, None when it can
+    missing = {"product_id", "warehouse_id", "movement_type", "quantity"} - m.keys()
+    if missing:
+        return f"movement missing {', '.join(sorted(missing))}"
+    if not _is_int(m["product_id"]) or not _is_int(m["warehouse_id"]):
+        return "product_id and warehouse_id must be integers"
+    if m["movement_type"] not in ("in", "out"):
+        return "Invalid movement type"
+    if not _is_int(m["quantity"]) or m["quantity"] <= 0:
+        return "Quantity must be a positive integer"
+    if m.get("performed_by") is not None and not _is_int(m["performed_by"]):
+        return "performed_by must be an integer"
+    return None
+
+# one queue per process, started on first use
+_queue = None
+_queue_lock = threading.Lock()
+
+def get_queue(engine):
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = StockQueue(engine)
+            atexit.register(_queue.close, 10)
+        return _queue
+
+def queue_stats():
+    # None until something was posted through the queue in this process
+    return _queue.stats() if _queue is not None else None
+
+def post(engine, movements, user_id=None):
+    return get_queue(engine).submit(movements, user_id)
+
+def move_stock_async(engine, product_id, warehouse_id, movement_type, quantity, user_id):
+    # the queued counterpart of move_stock, for one movement
+    return post(engine, [{"product_id": product_id, "warehouse_id": warehouse_id,
+                          "movement_type": movement_type, "quantity": quantity}], user_id)
@@ -0,0 +1,32 @@
+import importlib
+import streamlit as st
+
+from views.common import show_notice
+
+# one module per sidebar page, imported the first time the page is selected so a rerun
+# only loads what it shows. (not named pages/: streamlit turns a pages/ directory next
+# to the main script into its own multipage navigation)
+
+# sidebar label -> module in this package and the function rendering the page
+PAGES = {
+    "Inventory": "inventory_page",
+    "Products": "products_page",
+    "Warehouse": "warehouse_page",
+    "Suppliers": "suppliers_page",
+    "Orders and Payments": "orders_and_payments_page",
+    "Stock Movement": "stock_movement_page",
+    "Reorder": "reorder_page",
+    "Analytics": "analytics_page",
+    "Exports": "exports_page",
+    "Users": "users_page",
+    "System Status": "system_status_page",
+    "Order Items": "order_items_page"
+}
+
+def render(page, role):
+    # fragment reruns of this page record their queries against it
+    st.session_state.page = page
+    name = PAGES[page]
+    module = importlib.import_module(f"views.{name}")
+    show_notice()
+    getattr(module, name)(role)
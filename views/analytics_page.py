@@ -0,0 +1,41 @@
+import streamlit as st
+
+from db import engine
+import dimensions
+import analytics
+from crud_functions import get_primarykey
+from views.common import fragment
+
+# ANALYTICS PAGE
+def analytics_page(role):
+    if role not in ("admin", "manager"):
+        st.error("Not authorised")
+        return
+
+    st.header("Stock Velocity")
+
+    report = analytics.stock_velocity(engine)
+
+    warehouse_city = st.selectbox("Warehouse", ["All"] + dimensions.names(engine, "warehouse"), key="analytics_warehouse")
+    if warehouse_city != "All":
+        report = report[report["warehouse_city"] == warehouse_city]
+
+    st.caption(f"Outflow is the quantity moved out over the last 7, 30 and 90 days. Days of cover is the stock left "
+               f"divided by the average daily outflow of the last {analytics.COVER_WINDOW} days.")
+    st.dataframe(report.rename(columns={
+        "product_id": "Product ID", "product_name": "Product", "warehouse_id": "Warehouse ID",
+        "warehouse_city": "Warehouse", "stock_left": "Stock Left", "out_7d": "Out 7d", "out_30d": "Out 30d",
+        "out_90d": "Out 90d", "avg_daily_out": "Avg Daily Out", "days_of_cover": "Days of Cover"
+    }), use_container_width=True, hide_index=True)
+
+    st.subheader("Daily Outflow")
+    daily_outflow(warehouse_city)
+
+@fragment("daily_outflow")
+def daily_outflow(warehouse_city):
+    product_name = st.selectbox("Product", dimensions.names(engine, "products"), key="analytics_product")
+    if product_name:
+        product_id = get_primarykey(engine, "products", "product_id", ["product_name"], [product_name])
+        warehouse_id = get_primarykey(engine, "warehouse", "warehouse_id", ["warehouse_city"], [warehouse_city]) if warehouse_city != "All" else None
+        series = analytics.daily_outflow(engine, product_id, warehouse_id)
+        st.line_chart(series[["out", "rolling_7d_avg"]])
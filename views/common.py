@@ -0,0 +1,100 @@
+import functools
+import streamlit as st
+
+from db import engine
+import instrumentation
+import routing
+from crud_functions import paginate, estimate_count
+from grids import GRIDS
+
+# helpers shared by the page modules
+
+def fragment(section):
+
+    # st.fragment whose reruns are recorded as `section` of the current page in
+    # instrumentation.reruns; rendered as part of a full rerun it counts with the app
+    def decorate(fn):
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            if instrumentation.in_run():
+                return fn(*args, **kwargs)
+            # app.py does not run on a fragment rerun (a new script thread), so the page and the
+            # read-your-writes session come from session state
+            instrumentation.set_page(st.session_state.get("page", "-"))
+            routing.set_session(st.session_state.get("session_id"))
+            instrumentation.begin_run()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                instrumentation.end_run(section)
+        return st.fragment(run)
+    return decorate
+
+def saved(message):
+    # after a write inside a fragment: rerun the whole page so every grid shows it
+    st.session_state.notice = message
+    st.rerun()
+
+def show_notice():
+    notice = st.session_state.pop("notice", None)
+    if notice:
+        st.success(notice)
+
+# paginated "View All" grid shared by the pages
+def paged_grid(key, filters=None):
+    grid = GRIDS[key]
+    table = grid["table"]
+
+    col1, col2, col3 = st.columns([2, 1, 1])
+    sort_label = col1.selectbox("Sort by", list(grid["sort_options"]), key=f"{key}_sort")
+    page_size = col2.selectbox("Rows per page", [25, 50, 100, 250], index=1, key=f"{key}_size")
+    descending = col3.checkbox("Descending", value=grid.get("descending", False), key=f"{key}_desc")
+
+    # any change of sort, size or filters starts again from the first page
+    state_key = f"{key}_page"
+    signature = (sort_label, page_size, descending, repr(filters))
+    state = st.session_state.get(state_key)
+    if not state or state["signature"] != signature:
+        state = {"signature": signature, "cursor": None, "direction": "next", "number": 1}
+        st.session_state[state_key] = state
+
+    page = paginate(engine, table, grid["columns"], grid["sort_options"][sort_label], grid["key_column"],
+                    page_size, filters, state["cursor"], state["direction"], descending,
+                    as_frame=True, dtypes=grid.get("dtypes"))
+
+    if filters:
+        total = estimate_count(engine, table, filters)
+    else:
+        total = estimate_count(engine, grid.get("count_table", table))
+
+    rows = page["rows"]
+    if not rows.empty:
+        st.dataframe(rows.set_axis(grid["labels"], axis=1))
+    else:
+        st.info("No records found")
+
+    # walking backwards always leaves a next page, walking forwards only if one was fetched
+    has_next = page["has_more"] if state["direction"] == "next" else True
+    has_prev = state["number"] > 1
+
+    col1, col2, col3 = st.columns([1, 2, 1])
+    col1.button("Prev", key=f"{key}_prev", disabled=not has_prev or rows.empty,
+                on_click=_turn_page, args=(state_key, page["first"], "prev", -1))
+    col2.caption(f"Page {state['number']} · ~{total} rows")
+    col3.button("Next", key=f"{key}_next", disabled=not has_next or rows.empty,
+                on_click=_turn_page, args=(state_key, page["last"], "next", 1))
+
+def _turn_page(state_key, cursor, direction, step):
+    state = st.session_state[state_key]
+    state["cursor"] = cursor
+    state["direction"] = direction
+    state["number"] += step
+    if state["number"] == 1:
+        # back on the first page: drop the cursor so newly added leading rows show up
+        state["cursor"] = None
+        state["direction"] = "next"
+
+@fragment("grid")
+def grid_section(key, filters=None):
+    # a "View All" grid that pages and sorts without rerunning the rest of the page
+    paged_grid(key, filters)
@@ -0,0 +1,55 @@
+import os
+import tempfile
+import streamlit as st
+
+from db import engine
+import exports
+from views.common import fragment
+
+# EXPORTS PAGE
+def exports_page(role):
+    if role not in ("admin", "manager"):
+        st.error("Not authorised")
+        return
+
+    st.header("Exports")
+    st.caption("Rows are streamed from the database in chunks and written to a file on the server. "
+               f"Files up to {exports.DOWNLOAD_MAX_MB} MB can be downloaded here; for larger exports "
+               "use `python exports.py` on the server.")
+
+    export_form()
+
+@fragment("form")
+def export_form():
+
+    name = st.selectbox("Data", list(exports.EXPORTS), key="export_name")
+    fmt = st.selectbox("Format", exports.FORMATS, key="export_format")
+
+    start_date = end_date = None
+    if exports.EXPORTS[name]["date_column"]:
+        col1, col2 = st.columns(2)
+        start_date = col1.date_input("From", None, key="export_from")
+        end_date = col2.date_input("To", None, key="export_to")
+
+    if st.button("Export"):
+        path = os.path.join(tempfile.gettempdir(), f"wms_{name}_{st.session_state.session_id}.{fmt}")
+        status = st.empty()
+        try:
+            result = exports.export(engine, name, path, fmt, start_date, end_date, chunk_size=20000,
+                                    progress=lambda rows: status.write(f"{rows:,} rows written"))
+        except (ValueError, RuntimeError) as e:
+            st.error(str(e))
+            return
+        status.success(f"{result['rows']:,} rows in {result['seconds']} s ({result['rows_per_sec']:,} rows/sec), "
+                       f"{result['bytes'] / 1024 / 1024:.1f} MB")
+        st.session_state.export_file = path
+
+    path = st.session_state.get("export_file")
+    if path and os.path.exists(path):
+        # the download is served from memory, so its size is capped
+        if os.path.getsize(path) > exports.DOWNLOAD_MAX_MB * 1024 * 1024:
+            st.warning(f"The export is larger than {exports.DOWNLOAD_MAX_MB} MB, too large to download here. "
+                       "Narrow the date range or run `python exports.py` on the server.")
+            return
+        with open(path, "rb") as f:
+            st.download_button("Download", f, file_name=os.path.basename(path).replace(f"_{st.session_state.session_id}", ""))
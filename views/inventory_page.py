@@ -0,0 +1,137 @@
+import pandas as pd
+import streamlit as st
+from datetime import date, timedelta
+
+from db import engine
+import dimensions
+import snapshots
+from crud_functions import view, insert, get_primarykey, stock_row, adjust_stock
+from views.common import fragment, saved, paged_grid
+
+# INVENTORY PAGE
+def inventory_page(role):
+    st.header("Manage Inventory")
+
+    # get warehouse cities
+    warehouse_cities = dimensions.names(engine, "warehouse")
+
+    inventory_form(role, warehouse_cities)
+
+    st.divider()
+    st.subheader("View All Inventory")
+
+    inventory_grid(warehouse_cities)
+
+    # point-in-time stock for audits
+    if role in ("admin", "manager"):
+        st.divider()
+        st.subheader("Stock on a Past Date")
+        stock_as_of(warehouse_cities)
+
+@fragment("form")
+def inventory_form(role, warehouse_cities):
+    product_name = st.text_input("Product Name")
+
+    warehouse_city = st.selectbox(" Warehouse City", warehouse_cities)
+
+    stock_left = st.number_input("Stock Left", min_value=0)
+
+    product_id = None
+    warehouse_id = None
+    inventory_id = None
+
+    if product_name:
+        product_id = get_primarykey(engine, "products", "product_id", ["product_name"], [product_name])
+    if warehouse_city:
+        warehouse_id = get_primarykey(engine, "warehouse", "warehouse_id", ["warehouse_city"], [warehouse_city])
+    # the row as shown on the previous run is what an update was typed against
+    seen = st.session_state.get("inventory_seen")
+    current = None
+    if product_id and warehouse_city:
+        current = stock_row(engine, product_id, warehouse_id)
+    if current:
+        inventory_id = current["inventory_id"]
+        st.caption(f"Current stock: {current['stock_left']}")
+    st.session_state.inventory_seen = current
+
+    data = {
+    "product_id": product_id,
+    "warehouse_id": warehouse_id,
+    "stock_left": stock_left
+    }
+
+    col1, col2, col3 = st.columns(3)
+
+    # search
+    if col1.button("Search"):
+        if not inventory_id:
+            st.warning("no product found")
+            return
+
+        inventory = view(engine, "inventory", "inventory_id", inventory_id)
+        st.dataframe([inventory])
+
+    # add
+    if col2.button("Add") and role in ("admin", "manager"):
+# /
+        if not product_id or not warehouse_id:
+            st.warning("first add product/warehouse in the table")
+            return
+
+        if stock_left < 0:
+            st.error("Stock cannot be negative")
+            return
+
+        # warehouse capacity is checked inside the insert transaction
+# /
+        try:
+            insert(engine, "inventory", data)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        except Exception as e:
+            st.error(f"Failed to add inventory: {str(e)}")
+            return
+        saved("Inventory added")
+
+    # update: the difference to the stock shown is posted as a stock movement, and is
+    # refused if the row changed in between
+    if col3.button("Update") and role in ("admin", "manager"):
+        if not inventory_id:
+            st.warning("inventory record not found")
+            return
+        if not seen or seen["inventory_id"] != inventory_id:
+            seen = current
+        try:
+            adjust_stock(engine, product_id, warehouse_id, stock_left - seen["stock_left"],
+                         st.session_state.user["user_id"], expected_version=seen["version"])
+        except ValueError as e:
+            st.error(str(e))
+            return
+        saved("Inventory Updated")
+
+@fragment("grid")
+def inventory_grid(warehouse_cities):
+    # Show all inventory
+    filter_city = st.selectbox("Filter by warehouse", ["All"] + warehouse_cities, key="inventory_filter")
+    filters = {}
+    if filter_city != "All":
+        filters["warehouse_id"] = get_primarykey(engine, "warehouse", "warehouse_id", ["warehouse_city"], [filter_city])
+
+    paged_grid("inventory", filters)
+
+@fragment("as_of")
+def stock_as_of(warehouse_cities):
+    col1, col2, col3 = st.columns(3)
+    as_of = col1.date_input("As of", date.today() - timedelta(days=1), key="as_of_date")
+    as_of_city = col2.selectbox("Warehouse", ["All"] + warehouse_cities, key="as_of_warehouse")
+    as_of_product = col3.selectbox("Product", ["All"] + dimensions.names(engine, "products"), key="as_of_product")
+
+    if st.button("Show stock", key="as_of_button"):
+        rows = snapshots.stock_as_of(
+            engine, as_of,
+            get_primarykey(engine, "warehouse", "warehouse_id", ["warehouse_city"], [as_of_city]) if as_of_city != "All" else None,
+            get_primarykey(engine, "products", "product_id", ["product_name"], [as_of_product]) if as_of_product != "All" else None
+        )
+        st.dataframe(pd.DataFrame(rows, columns=["Product ID", "Warehouse ID", "Stock Left"]),
+                     use_container_width=True, hide_index=True)
@@ -0,0 +1,88 @@
+import streamlit as st
+
+from db import engine
+import dimensions
+from crud_functions import insert, delete, get_primarykey, fetch_frame
+from grids import ORDER_ITEM_DTYPES
+from views.common import fragment
+
+# ORDER ITEMS PAGE
+def order_items_page(role):
+    st.header("Manage Order Items")
+
+    order_items_form(role)
+
+    st.divider()
+    st.subheader("Delete Order Item")
+
+    delete_item_form(role)
+
+# the sections only show what they write, so each reruns on its own
+@fragment("form")
+def order_items_form(role):
+    order_id = st.number_input("Order ID", min_value=1)
+    
+    # Get product names
+    product_names = dimensions.names(engine, "products")
+    product_name = st.selectbox("Product", product_names)
+    
+    quantity_ordered = st.number_input("Quantity", min_value=1)
+    unit_price = st.number_input("Unit Price", min_value=1)
+    
+    product_id = None
+    if product_name:
+        product_id = get_primarykey(engine, "products", "product_id", ["product_name"], [product_name])
+    
+    data = {
+        "order_id": order_id,
+        "product_id": product_id,
+        "quantity_ordered": quantity_ordered,
+        "unit_price": unit_price
+    }
+    
+    col1, col2= st.columns(2)
+    
+    # Viewing all items for an order
+    if col1.button("View Order Items"):
+        query = """
+            SELECT oi.order_item_id, p.product_name, oi.quantity_ordered, 
+                   oi.unit_price, (oi.quantity_ordered * oi.unit_price) as total
+            FROM order_items oi
+            JOIN products p ON oi.product_id = p.product_id
+            WHERE oi.order_id = :oid
+        """
+        items = fetch_frame(engine, query, {"oid": order_id}, ORDER_ITEM_DTYPES)
+        if not items.empty:
+            df = items.set_axis(['Order Item ID','Product Name', 'Order Quantity','Unit Price', 'Total'], axis=1)
+            st.dataframe(df, use_container_width=True)
+            
+            # Show order total
+            total = items["total"].sum()
+            st.info(f"Order Total: ₹{total:.2f}")
+        else:
+            st.warning("No items found for this order")
+    
+    if col2.button("Add") and role in ("admin", "manager"):
+        if not order_id or not product_id:
+            st.warning("Order ID and Product are required")
+            return
+        try:
+            insert(engine, "order_items", data)
+            st.success("Item added to order")
+        except Exception as e:
+            st.error(f"Failed to add item: {str(e)}")
+
+@fragment("delete")
+def delete_item_form(role):
+    item_id = st.number_input("Order Item ID (from table above)", min_value=1)
+    
+    if st.button("Delete Item") and role in ("admin", "manager"):
+        if not item_id:
+            st.warning("Item ID required")
+            return
+        
+        try:
+            delete(engine, "order_items", "order_item_id", item_id)
+            st.success("Item deleted")
+        except Exception as e:
+            st.error(f"Failed to delete: {str(e)}")
@@ -0,0 +1,277 @@
+import streamlit as st
+import pandas as pd
+from decimal import Decimal
+
+from db import engine
+import dimensions
+import order_summary
+from crud_functions import (view, insert, update, delete, get_primarykey, get_col, fetch_frame, MONEY, PAYMENT_STATUS,
+                            create_order, receive_order)
+from grids import ORDERS_OVERVIEW_DTYPES, ORDER_ITEM_DTYPES
+from views.common import fragment, saved
+
+# ORDERS AND PAYMENTS PAGE
+def orders_and_payments_page(role):
+
+    # View all orders
+    st.subheader("All Purchase Orders")
+    
+    # totals come from the maintained order_summary rows
+    orders = fetch_frame(engine, order_summary.ORDERS_OVERVIEW, dtypes=ORDERS_OVERVIEW_DTYPES, cache=True)
+
+    if not orders.empty:
+        df = orders.set_axis(['Order ID', 'Supplier', 'Date', 'Status', 'Items', 'Total', 'Paid', 'Balance', 'Last Payment'],
+                             axis=1)
+        st.dataframe(df, use_container_width=True)
+    else:
+        st.info("No orders yet")
+    
+    st.divider()
+
+    order_forms(role)
+
+# typing into the forms reruns only them, writes rerun the page for the overview above
+@fragment("forms")
+def order_forms(role):
+    tab1, tab2 = st.tabs(["Add Order", "Record Payment"])
+    
+    # TAB 1: create new order
+    with tab1:        
+        supplier_name = st.text_input("Supplier Name")
+        order_id = st.number_input("Order ID", min_value=0)
+        order_status = st.selectbox("Order Status",["pending", "received", "cancelled"])
+        # where a received order's lines are booked in
+        receive_city = st.selectbox("Receive into warehouse", dimensions.names(engine, "warehouse"), key="receive_city")
+        
+        supplier_id = None
+        if supplier_name:
+            supplier_id = get_primarykey(engine, "suppliers", "supplier_id", ["supplier_name"], [supplier_name])
+
+        # lines of the new order, typed in or pasted from a spreadsheet; an empty unit
+        # price uses the product's current price
+        st.write("Order lines")
+        lines = st.data_editor(
+            pd.DataFrame({"product_name": pd.Series(dtype="string"), "quantity_ordered": pd.Series(dtype="Int64"),
+                          "unit_price": pd.Series(dtype="float64")}),
+            num_rows="dynamic", use_container_width=True, key="order_lines",
+            column_config={
+                "product_name": st.column_config.TextColumn("Product"),
+                "quantity_ordered": st.column_config.NumberColumn("Quantity", min_value=1, step=1),
+                "unit_price": st.column_config.NumberColumn("Unit Price", min_value=0, format="%.2f")
+            })
+        
+        col1, col2, col3 = st.columns(3)
+
+        if col1.button("Create Order"):
+            if not supplier_name:
+                st.warning("Supplier name is required")
+                return
+            elif not supplier_id:
+                st.error("Supplier does not exist!")
+                return
+
+            order_lines = []
+            for line in lines.itertuples(index=False):
+                if pd.isna(line.product_name) and pd.isna(line.quantity_ordered):
+                    continue
+                order_lines.append({
+                    "product_name": None if pd.isna(line.product_name) else line.product_name.strip(),
+                    "quantity_ordered": None if pd.isna(line.quantity_ordered) else int(line.quantity_ordered),
+                    "unit_price": None if pd.isna(line.unit_price) else Decimal(f"{line.unit_price:.2f}")
+                })
+
+            try:
+                new_order_id = create_order(engine, supplier_id, order_lines, st.session_state.user["user_id"])
+            except ValueError as e:
+                st.error(str(e))
+                return
+            del st.session_state["order_lines"]
+            saved(f"Order {new_order_id} created with {len(order_lines)} items")
+
+        # update status
+        if col2.button("Update Status") and role in ("admin", "manager"):
+            if not order_id:
+                st.warning("Order ID required")
+                return
+            try:
+                if order_status == "received":
+                    # books every line into stock in the same transaction as the status
+                    receive_warehouse = get_primarykey(engine, "warehouse", "warehouse_id", ["warehouse_city"], [receive_city])
+                    result = receive_order(engine, order_id, receive_warehouse, st.session_state.user["user_id"])
+                    if result["received"]:
+                        saved(f"Order received: {result['lines']} lines, {result['quantity']} units into {receive_city}")
+                    else:
+                        st.info("Order was already received")
+                else:
+                    update_data = {"order_status": order_status}
+                    update(engine, "orders", "order_id", order_id, update_data)
+                    saved("Order status updated")
+            except Exception as e:
+                st.error(f"Failed to update: {str(e)}")
+
+        # delete
+        if col3.button("Delete Order") and role in ("admin"):
+            delete(engine, "orders", "order_id", order_id)
+            saved("Order Deleted")
+
+     
+        # Show existing items
+        items_query = """
+            SELECT oi.order_item_id, p.product_name, oi.quantity_ordered, 
+                    oi.unit_price, (oi.quantity_ordered * oi.unit_price) as total
+            FROM order_items oi
+            JOIN products p ON oi.product_id = p.product_id
+            WHERE oi.order_id = :oid
+        """
+        items = fetch_frame(engine, items_query, {"oid": order_id}, ORDER_ITEM_DTYPES)
+        
+        st.write("Items in order:")
+        items_df = items.set_axis(['Order Item ID','Product Name','Quantity Ordered','Unit Price','Total'], axis=1)
+        st.dataframe(items_df)
+                
+        st.divider()
+
+        # Add new items
+        st.subheader("Add New Items to Order")
+        product_name = st.text_input("Product")
+        
+        product_id = None
+        unit_price = None
+        if product_name:
+            product_id = get_primarykey(engine, "products", "product_id", ["product_name"], [product_name])
+        if product_id:
+            unit_price = get_col(engine, "products", "unit_price", "product_id", product_id)
+        
+        quantity_ordered = st.number_input("Quantity", min_value=1)
+
+        
+        if st.button("Add item to order"):
+            if not order_id or not product_id:
+                st.warning("Order ID and Product required")
+                return
+            
+            order = view(engine, "orders", "order_id", order_id)
+
+            if not order:
+                st.error("Order not found")
+                return
+
+            data = {
+                "order_id": order_id,
+                "product_id": product_id,
+                "quantity_ordered": quantity_ordered,
+                "unit_price": unit_price
+            }
+            try:
+                insert(engine, "order_items", data)
+                saved("Item added!")
+            except Exception as e:
+                st.error(f"Failed: {str(e)}")
+    
+    # TAB 2: PAYMENTS
+    with tab2:        
+        payment_order_id = st.number_input("Order ID", min_value=1, key= "payments_oid")
+        amount_paid = st.number_input("Amount received", min_value=1)
+        payment_status = st.selectbox("Payment Status",["pending", "partial", "completed"])
+
+        order_total = 0
+        already_paid = 0
+        balance = 0
+
+        payment_id = get_primarykey(engine,"payments", "payment_id",["order_id"],[order_id])
+
+        data = {
+            "order_id": order_id,
+            "amount_paid": amount_paid,
+            "payment_status": payment_status,
+            "recorded_by": st.session_state.user["user_id"]
+        }
+
+        # payment summary
+        if payment_order_id:
+            summary = order_summary.get_summary(engine, payment_order_id)
+            order_total = summary["order_total"]
+            already_paid = summary["amount_paid"]
+            balance = summary["balance"]
+
+            st.write(f"Order Total : {order_total}")
+            st.write(f"Already Paid : {already_paid}")
+            st.write(f"Balance : {balance}")
+                
+        col1, col2, col3 = st.columns(3)
+
+        # Record new payment        
+        if col1.button("Record Payment", key="record_payment_btn"):
+            if not payment_order_id:
+                st.warning("Order ID required")
+                return
+            
+            if order_total == 0:
+                st.error("Order has no items")
+                return
+            
+            new_total_paid = already_paid + amount_paid
+
+            if new_total_paid >= order_total:
+                payment_status = "completed"
+            elif new_total_paid > 0:
+                payment_status = "partial"
+            else:
+                payment_status = "pending"
+            
+            data = {
+                "order_id": payment_order_id,
+                "amount_paid": amount_paid,
+                "payment_status": payment_status,
+                "recorded_by": st.session_state.user["user_id"]
+            }
+            
+            insert(engine, "payments", data)
+            saved(f"Remaining: ₹{order_total - new_total_paid}")
+
+    # add
+    if col2.button("Add") and role in ("admin", "manager"):
+# /
+        # Calculate order total and existing payments
+        summary = order_summary.get_summary(engine, order_id)
+        order_total = summary["order_total"]
+        already_paid = summary["amount_paid"]
+
+        if order_total == 0:
+            st.error("Cannot add payment: Order has no items")
+            return
+        
+        if already_paid + amount_paid > order_total:
+            st.error(f"Payment exceeds order total. Order: ${order_total:.2f}, Already paid: ${already_paid:.2f}")
+            return
+# /      
+        data["recorded_by"] = st.session_state.user["user_id"]
+
+        try:
+            insert(engine, "payments", data)
+            saved("Payment added")
+        except Exception as e:
+            st.error(f"Failed to add payment: {str(e)}")
+
+    # delete
+    if col3.button("Delete"):
+        if role != "admin":
+            st.error("Only admins can delete payments")
+            return
+        
+        delete(engine, "payments", "payment_id", payment_id)
+        st.success("Payment Deleted")
+
+        st.divider()
+        # Show payment history
+        st.write("Payment History")
+
+        payments_query = """
+            SELECT payment_id, amount_paid, payment_date, payment_status
+            FROM payments
+            WHERE order_id = :oid
+            ORDER BY payment_date DESC
+        """
+        payments_df = fetch_frame(engine, payments_query, {"oid": payment_order_id},
+                                  {"amount_paid": MONEY, "payment_status": PAYMENT_STATUS})
+        st.dataframe(payments_df)
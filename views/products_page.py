@@ -0,0 +1,82 @@
+import streamlit as st
+
+from db import engine
+from crud_functions import view, insert, update, delete, get_primarykey
+from views.common import fragment, saved, paged_grid
+
+# PRODUCTS PAGE
+def products_page(role):
+    st.header("Manage Products")
+
+    products_form(role)
+
+    st.divider()
+    st.subheader("View All Products")
+
+    products_grid()
+
+@fragment("form")
+def products_form(role):
+    product_name = st.text_input("Product_name")
+    category = st.text_input("Category")
+    unit_price = st.number_input("Unit Price")
+    reorder_level = st.number_input("Reorder Level")
+
+    product_id = None
+    if product_name:
+        product_id = get_primarykey(engine, "products", "product_id", ["product_name"], [product_name])
+
+    data = {
+        "product_name": product_name,
+        "category": category,
+        "unit_price": unit_price,
+        "reorder_level": reorder_level
+    }
+
+    col1, col2, col3, col4 = st.columns(4)
+
+    # search
+    if col1.button("Search"):
+
+        product = view(engine, "products", "product_id", product_id)
+
+        if not product:
+            st.warning("Product not found")
+        else:
+            st.dataframe([product])
+
+    # add
+    if col2.button("Add") and role in ("admin", "manager"):
+        if not product_name or not category:
+            st.warning("fill all required fields")
+            return
+
+        insert(engine, "products", data)
+        saved("product added")
+
+    # update
+    if col3.button("Update") and role in ("admin", "manager"):
+        try:
+            update(engine, "products", "product_id", product_id, data)
+        except Exception as e:
+            st.error("All fields are required to update.")
+            st.exception(e)
+            return
+        saved("Product Updated")
+
+    # delete
+    if col4.button("Delete") and role == "admin":
+        if not product_id:
+            st.warning("Product not found")
+            return
+
+        delete(engine, "products", "product_id", product_id)
+        saved("Product Deleted")
+
+@fragment("grid")
+def products_grid():
+    # Show all products
+    filter_category = st.text_input("Filter by category", key="products_filter")
+    filters = {"category": filter_category} if filter_category else None
+
+    paged_grid("products", filters)
@@ -0,0 +1,33 @@
+import pandas as pd
+import streamlit as st
+
+from db import engine
+import reorder
+from crud_functions import run_query
+
+# REORDER PAGE
+def reorder_page(role):
+    if role not in ("admin", "manager"):
+        st.error("Not authorised")
+        return
+
+    st.header("Reorder Suggestions")
+
+    low = reorder.low_stock(engine)
+    if not low:
+        st.success("No product is at or below its reorder level")
+        return
+
+    st.subheader(f"Low Stock ({len(low)})")
+    st.dataframe(pd.DataFrame(low), use_container_width=True, hide_index=True)
+
+    st.subheader("Suggested Purchase Orders")
+    st.caption(f"Quantities order up to {reorder.reorder_target_factor:g}x the reorder level, less stock and pending orders. "
+               "Suppliers are taken from each product's latest order.")
+    supplier_names = dict(run_query(engine, "SELECT supplier_id, supplier_name FROM suppliers", fetch=True, cache=True))
+    for supplier_id, lines in reorder.suggestions(engine).items():
+        label = supplier_names.get(supplier_id, "No supplier on record")
+        with st.expander(f"{label}: {len(lines)} lines"):
+            st.dataframe(pd.DataFrame(lines)[["product_id", "product_name", "stock_left", "reorder_level",
+                                              "on_order", "suggested_quantity"]],
+                         use_container_width=True, hide_index=True)
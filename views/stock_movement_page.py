@@ -0,0 +1,45 @@
+import streamlit as st
+from datetime import date, timedelta
+
+from db import engine
+import dimensions
+from crud_functions import get_primarykey, stock_history_filters
+from views.common import fragment, paged_grid
+
+# STOCK MOVEMENT PAGE
+# /
+def stock_movement_page(role):
+    st.header("Stock Movement History")
+
+    if role not in ("admin", "manager"):
+        st.error("Not authorised")
+        return
+
+    movement_history()
+
+# the filters and the grid rerun together, nothing else on the page depends on them
+@fragment("grid")
+def movement_history():
+
+    # a date window is required, it limits the query to the matching monthly partitions
+    col1, col2 = st.columns(2)
+    start_date = col1.date_input("From", date.today() - timedelta(days=30), key="movement_from")
+    end_date = col2.date_input("To", date.today(), key="movement_to")
+
+    col1, col2, col3 = st.columns(3)
+    product_name = col1.selectbox("Product", ["All"] + dimensions.names(engine, "products"), key="movement_product")
+    warehouse_city = col2.selectbox("Warehouse", ["All"] + dimensions.names(engine, "warehouse"), key="movement_warehouse")
+    movement_type = col3.selectbox("Type", ["All", "in", "out"], key="movement_filter")
+
+    product_id = get_primarykey(engine, "products", "product_id", ["product_name"], [product_name]) if product_name != "All" else None
+    warehouse_id = get_primarykey(engine, "warehouse", "warehouse_id", ["warehouse_city"], [warehouse_city]) if warehouse_city != "All" else None
+
+    try:
+        filters = stock_history_filters(start_date, end_date, product_id, warehouse_id,
+                                        movement_type if movement_type != "All" else None)
+    except ValueError as e:
+        st.error(str(e))
+        return
+
+    paged_grid("movements", filters)
+# /
@@ -0,0 +1,61 @@
+import streamlit as st
+
+from db import engine
+from crud_functions import view, insert, update, delete, get_primarykey
+from views.common import fragment, saved, grid_section
+
+# SUPPLIERS PAGE
+def suppliers_page(role):
+    st.header("Manage Suppliers")
+
+    suppliers_form(role)
+
+    st.divider()
+    st.subheader("View All Suppliers")
+
+    # Show all suppliers
+    grid_section("suppliers")
+
+@fragment("form")
+def suppliers_form(role):
+    supplier_name = st.text_input("Supplier Name")
+    supplier_phone = st.text_input("Supplier Phone")
+    supplier_email = st.text_input("Supplier Email")
+    supplier_city = st.text_input("Supplier City")
+
+    data = {
+        "supplier_name": supplier_name,
+        "supplier_phone": supplier_phone,
+        "supplier_email": supplier_email,
+        "supplier_city": supplier_city
+    }
+
+    supplier_id = None
+    if supplier_name:
+       supplier_id = get_primarykey(engine, "suppliers", "supplier_id", ["supplier_name"], [supplier_name])
+
+    col1, col2, col3, col4 = st.columns(4)
+
+    # search
+    if col1.button("Search"):
+        if not supplier_id:
+            st.warning("no records found")
+            return
+
+        supplier = view(engine, "suppliers", "supplier_id", supplier_id)
+        st.dataframe([supplier])
+
+    # add
+    if col2.button("Add") and role in ("admin", "manager"):
+        insert(engine, "suppliers", data)
+        saved("Supplier added")
+
+    # update
+    if col3.button("Update") and role in ("admin", "manager"):
+        update(engine, "suppliers", "supplier_id", supplier_id, data)
+        saved("Supplier Updated")
+
+    # delete
+    if col4.button("Delete") and role in ("admin"):
+        delete(engine, "suppliers", "supplier_id", supplier_id)
+        saved("Supplier Deleted")
@@ -0,0 +1,59 @@
+import pandas as pd
+import streamlit as st
+
+import query_cache
+import pool_metrics
+import instrumentation
+import stock_queue
+import routing
+
+# SYSTEM STATUS PAGE
+def system_status_page(role):
+    if role != "admin":
+        st.error("Only admin can view system status")
+        return
+
+    st.header("System Status")
+
+    st.subheader("Connection Pool")
+    st.dataframe(pd.DataFrame(pool_metrics.all_status()))
+    st.caption("Waits are the time a checkout spent queued for a free connection (last 1000 checkouts).")
+
+    st.subheader("Read Replica")
+    replica_status = routing.status()
+    if replica_status is None:
+        st.info("No read replica configured, all reads use the primary.")
+    else:
+        st.json(replica_status)
+
+    st.subheader("Query Cache")
+    st.json(query_cache.cache.stats())
+
+    st.subheader("Stock Posting Queue")
+    queue_stats = stock_queue.queue_stats()
+    if queue_stats is None:
+        st.info("No movements queued in this process.")
+    else:
+        st.json(queue_stats)
+
+    st.subheader("Query Latency")
+    if not instrumentation.query_metrics:
+        st.info("Query instrumentation is off, set query_metrics=true to enable it.")
+    else:
+        summary = instrumentation.stats.summary()
+        if summary:
+            st.dataframe(pd.DataFrame(summary), use_container_width=True)
+        st.caption(f"Statements slower than {instrumentation.slow_query_ms} ms are logged to wms.slow_query.")
+        st.download_button("Prometheus metrics", instrumentation.stats.prometheus(),
+                           file_name="wms_metrics.prom", mime="text/plain")
+
+    st.subheader("Reruns")
+    st.caption("Wall time (and statements, with query_metrics on) per script run in this process: "
+               "section app is a full rerun of the page, the others a fragment rerunning on its own.")
+    rerun_summary = instrumentation.reruns.summary()
+    if rerun_summary:
+        st.dataframe(pd.DataFrame(rerun_summary), use_container_width=True, hide_index=True)
+    if st.button("Reset rerun stats"):
+        instrumentation.reruns.reset()
+
+    st.button("Refresh")
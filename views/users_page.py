@@ -0,0 +1,101 @@
+import streamlit as st
+
+from db import engine
+from auth import hash_password, revoke_user
+from crud_functions import view, insert, update, delete
+from views.common import fragment, saved, grid_section
+
+# USERS PAGE
+def users_page(role):
+    if role != "admin":
+        st.error("Only admin can manage users")
+        return
+    
+    st.header("Manage Users")
+
+    users_form()
+
+    st.divider()
+    st.subheader("View All Users")
+    
+    # Show all users
+    grid_section("users")
+
+@fragment("form")
+def users_form():
+    user_id = st.text_input("User ID")
+    username = st.text_input("Username")
+    password = st.text_input("Password", type="password")
+    email = st.text_input("Email")
+    phone = st.text_input("Phone")
+    user_role = st.selectbox("Role", ["admin", "manager", "staff"])
+    
+    col1, col2, col3, col4 = st.columns(4)
+
+    # search
+    if col1.button("Search"):
+        user = view(engine, "users", "user_id", user_id)
+        if not user:
+            st.warning("User not found")
+            return
+        user.pop("password", None)
+        st.dataframe([user])
+
+    # password reset
+    st.divider()
+    st.subheader("Password Reset")
+
+    reset_user_id = st.number_input("User ID for password reset", min_value=1)
+    new_password = st.text_input("New Password", type="password")
+
+    if st.button("Reset password"):
+        if not new_password or not reset_user_id:
+            st.error("user id and new password required")
+            return
+        update(engine, "users", "user_id", reset_user_id, {"password": hash_password(new_password)})
+        revoke_user(reset_user_id)
+        st.success("Password reset successfully")
+
+    # add
+    if col2.button("Add"):
+        if not username or not password or not email:
+            st.error("username, password and emal required")
+            return
+        
+        data = {
+            "username": username,
+            "password": hash_password(password),
+            "email": email,
+            "phone": phone,
+            "role": user_role
+        }
+
+        insert(engine, "users", data)
+        saved("User added")
+
+    # update
+    if col3.button("Update"):
+        if not user_id:
+            st.warning("User ID required")
+            return
+        
+        data = {
+            "username": username,
+            "email": email,
+            "phone": phone,
+            "role": user_role
+        }
+
+        update(engine, "users", "user_id", user_id, data)
+        revoke_user(user_id)
+        saved("User Updated")
+
+    # delete
+    if col4.button("Delete"):
+        if not user_id:
+            st.warning("User ID required")
+            return
+        
+        delete(engine, "users", "user_id", user_id)
+        revoke_user(user_id)
+        saved("User Deleted")
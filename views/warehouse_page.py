@@ -0,0 +1,65 @@
+import pandas as pd
+import streamlit as st
+
+from db import engine
+import capacity
+from crud_functions import view, insert, update, delete, get_primarykey
+from views.common import fragment, saved, grid_section
+
+# WAREHOUSE PAGE
+def warehouse_page(role):
+    st.header("Manage Warehouse")
+
+    warehouse_form(role)
+
+    st.divider()
+    st.subheader("Utilization")
+
+    # utilization from the maintained used_capacity counters
+    utilization = capacity.utilization(engine)
+    if utilization:
+        df = pd.DataFrame(utilization, columns=['Warehouse ID','Warehouse City','Used','Capacity (m²)','Utilization %'])
+        st.dataframe(df)
+
+    st.divider()
+    st.subheader("View All Warehouses")
+
+    # Show all warehouses
+    grid_section("warehouse")
+
+@fragment("form")
+def warehouse_form(role):
+    warehouse_city = st.text_input("Warehouse City")
+
+    warehouse_total_capacity = st.number_input("Total Capacity (in m²)", min_value=1)
+
+    warehouse_id = None
+    if warehouse_city:
+        warehouse_id = get_primarykey(engine, "warehouse", "warehouse_id", ["warehouse_city"], [warehouse_city])
+
+    data = {
+        "warehouse_city": warehouse_city,
+        "warehouse_total_capacity": warehouse_total_capacity
+    }
+
+    col1, col2, col3, col4 = st.columns(4)
+
+    # search
+    if col1.button("Search"):
+        warehouse = view(engine, "warehouse", "warehouse_id", warehouse_id)
+        st.dataframe([warehouse])
+
+    # add
+    if col2.button("Add") and role in ("admin", "manager"):
+        insert(engine, "warehouse", data)
+        saved("warehouse added")
+
+    # update
+    if col3.button("Update") and role in ("admin", "manager"):
+        update(engine, "warehouse", "warehouse_id", warehouse_id, data)
+        saved("warehouse Updated")
+
+    # delete
+    if col4.button("Delete") and role in ("admin"):
+        delete(engine, "warehouse", "warehouse_id", warehouse_id)
+        saved("warehouse Deleted")